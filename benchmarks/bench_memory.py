@@ -0,0 +1,93 @@
+import argparse
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+import data_parse
+import e2e
+from benchmarks.synthetic import write_asb, write_e2e
+
+modes = [None, "int", "float32"]
+
+
+class LegacyAsb:
+    # data_parse.Data before the packed layout, kept as the baseline: a float64 copy of every column of the
+    # rows after the warm-up, for the time and the stat log.
+    def __init__(self, time, stat):
+        self.max_epoch = np.max(time[:,0])
+        self.time = self.trim(time)
+        self.stat = self.trim(stat)
+
+    def trim(self, trace):
+        data = trace.T
+        mask = data[0] >= self.max_epoch/2
+        return data[:,mask]
+
+
+class LegacyE2E:
+    # e2e.load and e2e.Data before the packed layout: a float64 copy of the whole trace, trimmed and rebased
+    # in place, so the copy of the warm-up rows stays alive too.
+    def __init__(self, data):
+        data = np.array(data).T
+        mark_index = np.where(data[-1] >= 1)[0][0]
+        start_index = np.where(data[0] > data[0, mark_index] + 10000)[0][0]
+        data = data.T[start_index:]
+        self.start = data[0, 0]
+        data -= data[0]
+        data = data.T
+        data[0] /= 1e3
+        self.data = data
+
+
+def retained(build, count):
+    """Bytes kept alive per object by `count` objects from build(), and the seconds one build takes."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    kept = [build() for _ in range(count)]
+    elapsed = (time.perf_counter() - start) / count
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return size / count, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the memory a loaded trace keeps in each Data layout.")
+    parser.add_argument("--size", type=float, default=8, help="size of the synthetic stat log and e2e log in MB")
+    parser.add_argument("--count", type=int, default=50, help="Data objects to hold at once, as in a sweep")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        time_path, stat_path, e2e_path = (os.path.join(tmp, name) for name in ("time.log", "stat.log", "e2e.log"))
+        write_asb(time_path, stat_path, int(args.size * 2**20))
+        write_e2e(e2e_path, int(args.size * 2**20))
+        time_trace, stat_trace = data_parse.parse_file(time_path), data_parse.parse_file(stat_path)
+        e2e_trace = e2e.parse_file(e2e_path)
+
+    layouts = [("legacy", lambda: LegacyAsb(time_trace, stat_trace), lambda: LegacyE2E(e2e_trace))]
+    for mode in modes:
+        layouts.append((str(mode), lambda mode=mode: data_parse.Data(time_trace, stat_trace, downcast=mode),
+                        lambda mode=mode: e2e.Data(e2e_trace, downcast=mode)))
+
+    print(f"{len(time_trace)} epochs, {len(e2e_trace)} e2e samples, {args.count} traces held")
+    print(f"{'layout':>10} {'asb KB/trace':>13} {'e2e KB/trace':>13} {'asb ms':>8} {'e2e ms':>8}")
+    baseline = None
+    for name, asb_build, e2e_build in layouts:
+        asb, asb_time = retained(asb_build, args.count)
+        run, run_time = retained(e2e_build, args.count)
+        line = f"{name:>10} {asb / 2**10:>13,.0f} {run / 2**10:>13,.0f} {asb_time * 1e3:>8.2f} {run_time * 1e3:>8.2f}"
+        if baseline is None:
+            baseline = (asb, run)
+        else:
+            line += f"   ({baseline[0] / asb:.1f}x, {baseline[1] / run:.1f}x smaller)"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
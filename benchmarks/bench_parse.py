@@ -0,0 +1,82 @@
+import argparse
+import os
+import re
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+import data_parse
+from benchmarks.synthetic import write_asb
+
+
+def legacy_parse(file):
+    # data_parse.parse before the compiled fast path and columnar output, kept as the baseline.
+    rn, rs, wn, ws, rempty = (None,) * 5
+    rc = np.full((12,), np.nan)
+    wc = np.full((12,), np.nan)
+    for line in file:
+        res = re.match(data_parse.pattern, line)
+        if res:
+            epoch, time, tps, rempty, ra, wa = (data_parse.to_float(x) for x in res.groups())
+            yield np.concatenate((np.array([epoch, time, tps, rempty, ra, wa, rn, rs, wn, ws]), rc, wc))
+            rn, rs, wn, ws, rempty = (None,) * 5
+            rc = np.full((12,), np.nan)
+            wc = np.full((12,), np.nan)
+        elif re.match(".*10:.*20:.*95:", line):
+            res = re.match(data_parse.stat_pattern, line).groups()
+            if res[4] == "Non-empty read size":
+                rn, rs = int(res[0]), int(res[1])
+                rc = legacy_pecentile(line)
+            elif res[4] == "Write size":
+                wn, ws = int(res[0]), int(res[1])
+                wc = legacy_pecentile(line)
+
+
+def legacy_load(file):
+    return np.array(list(legacy_parse(file)))
+
+
+def legacy_pecentile(msg):
+    res = re.search(data_parse.pecentile_pattern, msg).groups()
+    return np.array([data_parse.parse_number(res[i]) for i in range(0, 36, 3)])
+
+
+def run(name, parser, path, memory=False):
+    with open(path) as f:
+        lines = sum(1 for _ in f)
+    if memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    with open(path) as f:
+        epochs = len(parser(f))
+    elapsed = time.perf_counter() - start
+    report = f"{name:>8}: {epochs} epochs, {lines} lines in {elapsed:.2f} s, {lines / elapsed:,.0f} lines/s"
+    if memory:
+        report += f", peak {tracemalloc.get_traced_memory()[1] / 2**20:.1f} MB"
+        tracemalloc.stop()
+    print(report)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare data_parse.parse with the legacy parser.")
+    parser.add_argument("--size", type=float, default=256, help="size of the synthetic stat log in MB")
+    parser.add_argument("--dir", default=None, help="where to write the synthetic trace (default: a temp dir)")
+    parser.add_argument("--skip-legacy", action="store_true")
+    parser.add_argument("--memory", action="store_true", help="also report peak traced memory (slower)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        time_path, stat_path = os.path.join(tmp, "time.log"), os.path.join(tmp, "stat.log")
+        write_asb(time_path, stat_path, int(args.size * 2**20))
+        print(f"stat log: {os.path.getsize(stat_path) / 2**20:.0f} MB")
+        new = run("parse", data_parse.parse, stat_path, args.memory)
+        if not args.skip_legacy:
+            old = run("legacy", legacy_load, stat_path, args.memory)
+            print(f"speedup: {old / new:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+import data_parse
+from benchmarks.synthetic import write_asb
+
+
+def tokens(path):
+    result = []
+    with open(path) as f:
+        for line in f:
+            body = line.rstrip("\n")
+            if body.endswith(data_parse.read_size_mark) or body.endswith(data_parse.write_size_mark):
+                result.extend(data_parse.pecentile_re.search(body).groups())
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-token parse_number with the vectorized parse_numbers.")
+    parser.add_argument("--size", type=float, default=256, help="size of the synthetic stat log in MB")
+    parser.add_argument("--dir", default=None, help="where to write the synthetic trace (default: a temp dir)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        time_path, stat_path = os.path.join(tmp, "time.log"), os.path.join(tmp, "stat.log")
+        write_asb(time_path, stat_path, int(args.size * 2**20))
+        items = tokens(stat_path)
+
+    start = time.perf_counter()
+    loop = np.array([data_parse.parse_number(x) for x in items])
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    vectorized = data_parse.parse_numbers(items)
+    vectorized_time = time.perf_counter() - start
+
+    assert np.array_equal(loop, vectorized, equal_nan=True)
+    print(f"{len(items)} tokens")
+    print(f"      loop: {loop_time:.3f} s, {len(items) / loop_time:,.0f} tokens/s")
+    print(f"vectorized: {vectorized_time:.3f} s, {len(items) / vectorized_time:,.0f} tokens/s")
+    print(f"speedup: {loop_time / vectorized_time:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
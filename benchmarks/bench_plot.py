@@ -0,0 +1,55 @@
+import argparse
+import os
+import tempfile
+import time
+
+import matplotlib
+import numpy as np
+
+matplotlib.use("Agg")
+from matplotlib import pyplot as plt
+
+from plot import LinePlot
+
+
+def series(points, seed=0):
+    """Throughput-like samples, one per second: a slow drift plus per-sample noise and occasional stalls."""
+    rng = np.random.default_rng(seed)
+    X = np.arange(points, dtype=float)
+    Y = 5000 + np.cumsum(rng.normal(0, 5, points)) + rng.normal(0, 300, points)
+    Y[rng.random(points) < 1e-3] = 0
+    return X, np.maximum(Y, 0)
+
+
+def render(X, Y, path, decimate, dpi):
+    start = time.perf_counter()
+    fig = plt.figure(figsize=(8, 3), dpi=dpi)
+    ax = fig.add_subplot(111)
+    lp = LinePlot(decimate=decimate)
+    lp.add(X, Y, label="tps")
+    lp.draw(ax)
+    plt.savefig(path, bbox_inches="tight")
+    plt.close(fig)
+    return time.perf_counter() - start, os.path.getsize(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare LinePlot rendering with and without decimation.")
+    parser.add_argument("--points", type=int, default=500_000, help="samples in the synthetic series")
+    parser.add_argument("--dpi", type=int, default=200)
+    parser.add_argument("--format", default="pdf", help="output format, as for savefig")
+    args = parser.parse_args()
+
+    X, Y = series(args.points)
+    with tempfile.TemporaryDirectory() as tmp:
+        full_time, full_size = render(X, Y, os.path.join(tmp, f"full.{args.format}"), False, args.dpi)
+        fast_time, fast_size = render(X, Y, os.path.join(tmp, f"decimated.{args.format}"), True, args.dpi)
+
+    print(f"{args.points} points")
+    print(f"     full: {full_time:.3f} s, {full_size / 2**10:,.0f} KB")
+    print(f"decimated: {fast_time:.3f} s, {fast_size / 2**10:,.0f} KB")
+    print(f"speedup: {full_time / fast_time:.2f}x, size: {fast_size / full_size:.1%}")
+
+
+if __name__ == "__main__":
+    main()
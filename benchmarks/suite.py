@@ -0,0 +1,242 @@
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import write_asb, write_e2e
+
+folder = "bench"
+figure_authdbs = ["lvmt", "lvmt64", "lvmt16", "rain", "mpt"]
+figure_runs = ["raw", "lvmt", "lvmt64", "lvmt16", "rain", "mpt"]
+
+
+def generate(root, size):
+    """Writes the synthetic experiment tree the scenarios read, unless it is already there: one ASB trace
+    whose stat log has `size` bytes, one e2e log of `size` bytes, and smaller traces for the figures."""
+    import data_parse
+    import e2e
+
+    marker = os.path.join(root, f"complete-{size}")
+    if os.path.exists(marker):
+        return
+    os.makedirs(os.path.join(root, "paper_experiment", folder), exist_ok=True)
+    os.makedirs(os.path.join(root, "experiment_data/metrics", folder), exist_ok=True)
+
+    def asb(authdb, keys, size, seed):
+        write_asb(os.path.join(root, data_parse.path(authdb, keys, folder)),
+                  os.path.join(root, data_parse.path(authdb, keys, folder, stat=True)), size, seed)
+
+    asb("lvmt", "1m", size, 0)
+    write_e2e(os.path.join(root, e2e.path("lvmt", "1m", False, folder)), size, 0)
+    for idx, authdb in enumerate(figure_authdbs):
+        asb(authdb, "100m", size // 8, idx + 1)
+    for idx, ty in enumerate(figure_runs):
+        write_e2e(os.path.join(root, e2e.path(ty, "5m", False, folder)), size // 8, idx + 1)
+    open(marker, "w").close()
+
+
+def setup(root):
+    # The scenarios read the synthetic tree instead of the experiments configured in path.py, and parse
+    # every time unless they ask for the cache.
+    import cache
+    import data_parse
+    import e2e
+    data_parse.ASB_PATH = root
+    e2e.ASB_E2E_PATH = root
+    cache.CACHE_PATH = None
+
+
+def asb_parse(root, parallel=False):
+    import data_parse
+    stat = os.path.join(root, data_parse.path("lvmt", "1m", folder, stat=True))
+    with open(stat) as f:
+        lines = sum(1 for _ in f)
+    start = time.perf_counter()
+    if parallel:
+        epochs = len(data_parse.parse_file_parallel(stat))
+    else:
+        epochs = len(data_parse.parse_file(stat))
+    return time.perf_counter() - start, dict(bytes=os.path.getsize(stat), lines=lines, epochs=epochs)
+
+
+def asb_parse_parallel(root):
+    return asb_parse(root, parallel=True)
+
+
+def e2e_parse(root):
+    import e2e
+    log = os.path.join(root, e2e.path("lvmt", "1m", False, folder))
+    with open(log) as f:
+        lines = sum(1 for _ in f)
+    start = time.perf_counter()
+    records = len(e2e.parse_file(log))
+    return time.perf_counter() - start, dict(bytes=os.path.getsize(log), lines=lines, records=records)
+
+
+def asb_load(root, cached=False):
+    import cache
+    import data_parse
+    if cached:
+        cache.CACHE_PATH = os.path.join(root, "cache")
+        data_parse.load("lvmt", "1m", folder)
+    start = time.perf_counter()
+    data_parse.load("lvmt", "1m", folder)
+    elapsed = time.perf_counter() - start
+    logs = [os.path.join(root, data_parse.path("lvmt", "1m", folder, stat=stat)) for stat in (False, True)]
+    return elapsed, dict(bytes=sum(os.path.getsize(p) for p in logs))
+
+
+def asb_load_cached(root):
+    return asb_load(root, cached=True)
+
+
+def asb_data(root):
+    import data_parse
+    time_trace = data_parse.load_trace("lvmt", "1m", folder)
+    stat_trace = data_parse.load_trace("lvmt", "1m", folder, stat=True)
+    start = time.perf_counter()
+    data = data_parse.Data(time_trace, stat_trace)
+    np.mean(data.tps), np.mean(data.rs), data.rc.mean(axis=1)
+    return time.perf_counter() - start, dict(epochs=len(time_trace))
+
+
+def e2e_load(root):
+    import e2e
+    log = os.path.join(root, e2e.path("lvmt", "1m", False, folder))
+    start = time.perf_counter()
+    e2e.load("lvmt", "1m", folder=folder).tps
+    return time.perf_counter() - start, dict(bytes=os.path.getsize(log))
+
+
+def figure(name, root):
+    import matplotlib
+    matplotlib.use("Agg")
+    import main
+    main.loader.folder = folder
+    main.output_dir = os.path.join(root, "figures")
+    os.makedirs(main.output_dir, exist_ok=True)
+    start = time.perf_counter()
+    _, _, error = main.render(name)
+    if error is not None:
+        raise RuntimeError(f"{name}: {error}")
+    return time.perf_counter() - start, dict(pdf_bytes=os.path.getsize(main.output(name)))
+
+
+def figure_asb_rc(root):
+    return figure("asb_rc", root)
+
+
+def figure_native_breakdown(root):
+    return figure("native_breakdown", root)
+
+
+scenarios = {
+    "asb_parse": asb_parse,
+    "asb_parse_parallel": asb_parse_parallel,
+    "e2e_parse": e2e_parse,
+    "asb_load": asb_load,
+    "asb_load_cached": asb_load_cached,
+    "asb_data": asb_data,
+    "e2e_load": e2e_load,
+    "figure_asb_rc": figure_asb_rc,
+    "figure_native_breakdown": figure_native_breakdown,
+}
+
+
+def child(name, root, conn):
+    setup(root)
+    elapsed, counters = scenarios[name](root)
+    # ru_maxrss is in KB on Linux.
+    conn.send((elapsed, counters, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**10))
+    conn.close()
+
+
+def measure(name, root):
+    """Runs a scenario in a fresh process, so its peak RSS is not inflated by earlier scenarios."""
+    context = multiprocessing.get_context("spawn")
+    parent, conn = context.Pipe(duplex=False)
+    process = context.Process(target=child, args=(name, root, conn))
+    process.start()
+    conn.close()
+    try:
+        elapsed, counters, rss = parent.recv()
+    except EOFError:
+        raise RuntimeError(f"scenario {name} failed")
+    finally:
+        process.join()
+
+    result = dict(seconds=elapsed, peak_rss_mb=rss, **counters)
+    if "bytes" in counters:
+        result["mb_per_s"] = counters["bytes"] / 2**20 / elapsed
+    if "lines" in counters:
+        result["lines_per_s"] = counters["lines"] / elapsed
+    return result
+
+
+def version():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True)
+        return commit.stdout.strip() + ("-dirty" if dirty.stdout.strip() else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def previous(history, size):
+    for run in reversed(history):
+        if run["size_mb"] == size:
+            return run
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time parsing, loading, Data construction and figure rendering "
+                                                 "on synthetic traces and record the results.")
+    parser.add_argument("--size", type=float, default=64, help="size of the main synthetic logs in MB (10 to 10240)")
+    parser.add_argument("--only", help="comma-separated scenarios to run (default: all)")
+    parser.add_argument("--data", default=None, help="directory to keep the synthetic traces in between runs "
+                                                     "(default: a temp dir, removed afterwards)")
+    parser.add_argument("--history", default="bench-history.json", help="JSON file the results are appended to")
+    parser.add_argument("--label", default=None, help="name of this run in the history (default: git commit)")
+    args = parser.parse_args()
+
+    names = list(scenarios) if args.only is None else args.only.split(",")
+    unknown = [name for name in names if name not in scenarios]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+
+    history = []
+    if os.path.exists(args.history):
+        with open(args.history) as f:
+            history = json.load(f)
+    before = previous(history, args.size)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.abspath(args.data or tmp)
+        generate(root, int(args.size * 2**20))
+        results = {}
+        for name in names:
+            results[name] = result = measure(name, root)
+            line = f"{name:>24}: {result['seconds']:8.3f} s, peak {result['peak_rss_mb']:7.1f} MB"
+            if "mb_per_s" in result:
+                line += f", {result['mb_per_s']:7.1f} MB/s"
+            if before is not None and name in before["results"]:
+                line += f", {before['results'][name]['seconds'] / result['seconds']:.2f}x vs {before['label']}"
+            print(line)
+
+    history.append(dict(label=args.label or version(), date=datetime.datetime.now().isoformat(timespec="seconds"),
+                        python=platform.python_version(), numpy=np.__version__, size_mb=args.size, results=results))
+    with open(args.history, "w") as f:
+        json.dump(history, f, indent=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import random
+
+from data_parse import percentiles
+
+# Deterministic generators for logs in the formats data_parse.py and e2e.py expect.
+
+
+def size_token(rng):
+    r = rng.random()
+    if r < 0.05:
+        return "none"
+    value = rng.randint(1, 5000)
+    if r < 0.2:
+        return f"{value}k"
+    if r < 0.23:
+        return f"{value}m"
+    return str(value)
+
+
+def summary_line(epoch, time, rng):
+    return (f"{epoch:>6}: {time:>9.3f} s > {rng.randint(1000, 900000):>11,} ops, {rng.random() * 20:>9.3f} us/op, "
+            f"{rng.randint(0, 99999):>7,} empty reads > Read amp {rng.random() * 9:>6.2f}, "
+            f"Write amp {rng.random() * 9:>6.2f} > mem {rng.randint(1, 64)} GB\n")
+
+
+def stat_line(msg, rng):
+    body = " ".join(f"{n}: {size_token(rng):>5}" for n in percentiles)
+    return f"    {body} > Cnt {rng.randint(1, 99999):>7}, Avg {rng.randint(1, 999):>5}. {msg}\n"
+
+
+def asb_epoch(epoch, time, rng):
+    """Returns the time log line and the stat log block of one epoch."""
+    summary = summary_line(epoch, time, rng)
+    stat = (f"Epoch {epoch} statistics\n"
+            + stat_line("Non-empty read size", rng)
+            + stat_line("Empty read size", rng)
+            + stat_line("Read latency", rng)
+            + stat_line("Write size", rng)
+            + summary)
+    return summary, stat
+
+
+def write_asb(time_path, stat_path, size, seed=0):
+    """Writes a time/stat log pair, stopping once the stat log reaches `size` bytes."""
+    rng = random.Random(seed)
+    written = 0
+    epoch, time = 0, 0.0
+    with open(time_path, "w") as ft, open(stat_path, "w") as fs:
+        while written < size:
+            epoch += 1
+            time += rng.random()
+            summary, stat = asb_epoch(epoch, time, rng)
+            ft.write(summary)
+            fs.write(stat)
+            written += len(stat)
+    return epoch
+
+
+metrics_groups = {
+    "system_metrics": ["good_tps"],
+    "timer": ["storage::get", "storage::set", "storage::commit", "backend::get", "backend::set", "backend::commit",
+              "consensus::handle_epoch_execution"],
+    "debug": ["debug"],
+}
+
+
+def write_e2e(path, size, seed=0, warmup=20):
+    """Writes a Conflux metrics log of about `size` bytes: one line per group and second, with cumulative
+    counters, and the debug mark set after `warmup` seconds. Returns the number of seconds written."""
+    rng = random.Random(seed)
+    counters = {}
+    written = 0
+    second, timestamp = 0, 1690000000000
+    with open(path, "w") as f:
+        while written < size:
+            timestamp += rng.randint(990, 1010)
+            for group, names in metrics_groups.items():
+                items = []
+                for name in names:
+                    key = f"{name}.count"
+                    if group == "debug":
+                        counters[key] = int(second >= warmup)
+                    else:
+                        counters[key] = counters.get(key, 0) + rng.randint(1000, 9000) * (1000 if group == "timer" else 1)
+                    items.append(f"{key}: {counters[key]}")
+                    items.append(f"{name}.m1: {rng.random():.3f}")
+                line = f"{timestamp}, {group}, Group, {{{', '.join(items)}}}\n"
+                f.write(line)
+                written += len(line)
+            second += 1
+    return second
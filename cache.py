@@ -0,0 +1,124 @@
+import hashlib
+import inspect
+import os
+import numpy as np
+
+import compressed
+import timing
+from path import CACHE_PATH
+
+
+def entry(path, tag=""):
+    # One cache slot per log file. The size and mtime are part of the name, so
+    # a log rewritten by the benchmark never matches its old entry. The tag
+    # separates parsers, and versions of a parser, whose output differs.
+    st = os.stat(path)
+    slot = hashlib.sha1(os.path.abspath(path).encode()).hexdigest()
+    version = hashlib.sha1(tag.encode()).hexdigest()[:8]
+    return slot, f"{slot}-{st.st_size}-{st.st_mtime_ns}-{version}.npy"
+
+
+def version(*parts):
+    """A short hash of the source of the functions and classes in `parts` (strings are taken as they are), for
+    tags that change whenever the parser does."""
+    source = "\n".join(p if isinstance(p, str) else inspect.getsource(p) for p in parts)
+    return hashlib.sha1(source.encode()).hexdigest()[:12]
+
+
+def evict(slot, keep=None):
+    for name in os.listdir(CACHE_PATH):
+        if name.startswith(f"{slot}-") and name.endswith(".npy") and name != keep:
+            os.remove(os.path.join(CACHE_PATH, name))
+
+
+def stored_tag(stored):
+    try:
+        with open(stored + ".tag") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def binary(path, tag=""):
+    """Returns the converted .npy/.npz file next to a text log, if there is one at least as new as the log
+    or its compressed copy and written with the same tag. A binary written with another tag is skipped, or
+    reported if the log it came from is gone."""
+    base = os.path.splitext(path)[0]
+    log = compressed.locate(path)
+    for stored in (base + ".npy", base + ".npz"):
+        if not os.path.exists(stored):
+            continue
+        if os.path.exists(log) and os.path.getmtime(stored) < os.path.getmtime(log):
+            continue
+        if stored_tag(stored) != tag:
+            if not os.path.exists(log):
+                raise ValueError(f"{stored} was converted by another version of the parser and its log is gone")
+            continue
+        return stored
+    return None
+
+
+def read_binary(stored):
+    if stored.endswith(".npz"):
+        with np.load(stored) as f:
+            return f["data"]
+    return np.load(stored, mmap_mode="r")
+
+
+def write_binary(path, data, tag="", compress=False):
+    """Stores a parsed log next to it, column-major and little-endian, so that binary() finds it. The tag is
+    kept in a .tag file next to it."""
+    base = os.path.splitext(path)[0]
+    data = np.asfortranarray(data, dtype="<f8")
+    stored = base + (".npz" if compress else ".npy")
+    tmp = f"{stored}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        if compress:
+            np.savez_compressed(f, data=data)
+        else:
+            np.save(f, data)
+    with open(tmp + ".tag", "w") as f:
+        f.write(tag)
+    os.replace(tmp + ".tag", stored + ".tag")
+    os.replace(tmp, stored)
+    return stored
+
+
+def load(path, parser, tag=""):
+    """Returns parser(path), reusing the parsed array from a previous run when the log is unchanged.
+
+    The tag names the parser and its version (see version()), so that a changed parser does not reuse arrays
+    parsed by the old one. A binary copy of the log written by convert.py with the same tag is memory-mapped
+    instead of parsing the text. If only a compressed copy of the log exists (see compressed.locate), the
+    parser is given that.
+    """
+    stored = binary(path, tag)
+    if stored is not None:
+        with timing.span("binary read"):
+            return read_binary(stored)
+
+    path = compressed.locate(path)
+    if CACHE_PATH is None:
+        return parser(path)
+
+    os.makedirs(CACHE_PATH, exist_ok=True)
+    slot, name = entry(path, tag)
+    cached = os.path.join(CACHE_PATH, name)
+    if os.path.exists(cached):
+        with timing.span("cache read"):
+            return np.load(cached, mmap_mode="r")
+
+    data = parser(path)
+    with timing.span("cache write"):
+        evict(slot)
+        tmp = f"{cached}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, data)
+        os.replace(tmp, cached)
+    return data
+
+
+def clear():
+    if CACHE_PATH is not None and os.path.isdir(CACHE_PATH):
+        for name in os.listdir(CACHE_PATH):
+            os.remove(os.path.join(CACHE_PATH, name))
@@ -0,0 +1,85 @@
+import fnmatch
+import os
+import re
+
+import data_parse
+import e2e
+from path import ASB_PATH, ASB_E2E_PATH
+
+asb_dir = "paper_experiment"
+e2e_dir = "experiment_data/metrics"
+
+
+def folders(root):
+    if not os.path.isdir(root):
+        return []
+    return sorted(name for name in os.listdir(root) if os.path.isdir(os.path.join(root, name)))
+
+
+def repeats(folder="osdi23"):
+    """Folders holding repetitions of the ASB experiments in `folder`: the folder itself and its numbered
+    copies folder-1, folder-2, ..., in that order. Just `folder` if none of them exists."""
+    found = [name for name in folders(os.path.join(ASB_PATH, asb_dir))
+             if name == folder or re.fullmatch(re.escape(folder) + r"-\d+", name)]
+    return sorted(found, key=lambda name: 0 if name == folder else int(name[len(folder) + 1:])) or [folder]
+
+
+def matches(values, patterns):
+    return all(pattern is None or fnmatch.fnmatchcase(str(value), str(pattern))
+               for (value, pattern) in zip(values, patterns))
+
+
+class Catalog:
+    """Every trace of every experiment folder, from one listing of each directory.
+
+    File names are parsed into ASB requests (authdb, keys, folder, variant) and e2e requests (ty, size, erc20,
+    folder), the tuples load_asb_many and load_e2e_many take. Existence checks are set lookups, and find_asb
+    and find_e2e match shell-style patterns against the fields, None matching anything.
+    """
+
+    def __init__(self):
+        self.asb = set()
+        self.stat = set()
+        self.e2e = set()
+        for folder in folders(os.path.join(ASB_PATH, asb_dir)):
+            for (kind, authdb, keys, variant) in data_parse.directory(folder).traces:
+                (self.asb if kind == "time" else self.stat).add((authdb, keys, folder, variant))
+        for folder in folders(os.path.join(ASB_E2E_PATH, e2e_dir)):
+            self.e2e.update((ty, size, erc20, folder) for (ty, size, erc20) in e2e.runs(folder))
+
+    def has_asb(self, authdb, keys, folder="osdi23", variant="", stat=False):
+        if stat:
+            return (authdb, keys, folder, "") in self.stat
+        return (authdb, keys, folder, variant) in self.asb
+
+    def has_e2e(self, ty, size, erc20=False, folder="osdi23"):
+        return (ty, size, erc20, folder) in self.e2e
+
+    def find_asb(self, authdb=None, keys=None, folder=None, variant=None, stat=False):
+        found = self.stat if stat else self.asb
+        return sorted(req for req in found if matches(req, (authdb, keys, folder, variant)))
+
+    def find_e2e(self, ty=None, size=None, erc20=None, folder=None):
+        return sorted(req for req in self.e2e if matches(req, (ty, size, erc20, folder)))
+
+    def asb_log(self, authdb, keys, folder="osdi23", variant="", stat=False):
+        if stat:
+            return os.path.join(ASB_PATH, data_parse.path(authdb, keys, folder, stat=True))
+        return os.path.join(ASB_PATH, data_parse.path(authdb, keys, folder, **data_parse.memory(variant)))
+
+    def e2e_log(self, ty, size, erc20=False, folder="osdi23"):
+        return os.path.join(ASB_E2E_PATH, e2e.path(ty, size, erc20, folder))
+
+
+def report(results):
+    """Lines describing the markers among batch loader results: one line counting the traces that were never
+    recorded, and one line per trace that exists but cannot be parsed."""
+    missing = sorted({r.path for r in results if type(r) is data_parse.Missing})
+    corrupt = {r.path: r.error for r in results if isinstance(r, data_parse.Corrupt)}
+    lines = []
+    if missing:
+        names = ", ".join(f"{os.path.basename(os.path.dirname(p))}/{os.path.splitext(os.path.basename(p))[0]}"
+                          for p in missing)
+        lines.append(f"missing: {len(missing)} traces ({names})")
+    lines += [f"corrupt: {p}: {error}" for (p, error) in sorted(corrupt.items())]
+    return lines
@@ -0,0 +1,88 @@
+import gzip
+import io
+import lzma
+import os
+import shutil
+import subprocess
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from path import DECOMPRESS_THREADS
+
+suffixes = (".gz", ".xz", ".zst")
+
+# External decompressors that use several threads, tried when DECOMPRESS_THREADS > 0.
+tools = {
+    ".gz": lambda threads: ["pigz", "-dc", "-p", str(threads)],
+    ".xz": lambda threads: ["xz", "-dc", "-T", str(threads)],
+    ".zst": lambda threads: ["zstd", "-dcq", f"-T{threads}"],
+}
+
+
+def plain(path):
+    """The text log a compressed log is a copy of."""
+    for suffix in suffixes:
+        if path.endswith(suffix):
+            return path[:-len(suffix)]
+    return path
+
+
+def locate(path):
+    """The log to read for `path`: the path itself if it exists, otherwise its first compressed copy that
+    does, otherwise the path again so that opening it reports it as missing."""
+    if os.path.exists(path):
+        return path
+    for suffix in suffixes:
+        if os.path.exists(path + suffix):
+            return path + suffix
+    return path
+
+
+class Pipe(io.BufferedReader):
+    """The output of an external decompressor, read as a stream."""
+
+    def __init__(self, command, path):
+        self.command = command
+        self.path = path
+        self.process = subprocess.Popen(command + [path], stdout=subprocess.PIPE, bufsize=0)
+        super().__init__(self.process.stdout)
+
+    def close(self):
+        if self.closed:
+            return
+        super().close()
+        # A reader that stops early makes the tool die of SIGPIPE, which is not an error.
+        code = self.process.wait()
+        if code > 0:
+            raise OSError(f"{self.command[0]} exited with {code} on {self.path}")
+
+
+def open_log(path, text=True, threads=DECOMPRESS_THREADS):
+    """Opens a log for reading, decompressing .gz, .xz and .zst logs while they are read.
+
+    Text mode decodes like open(path) does, so parsers see the same lines either way. .zst needs the
+    optional zstandard package or the zstd tool.
+    """
+    suffix = os.path.splitext(path)[1]
+    if suffix not in suffixes:
+        return open(path) if text else open(path, "rb")
+    if not os.path.exists(path):
+        raise FileNotFoundError(2, "No such file or directory", path)
+
+    command = tools[suffix](max(threads, 1))
+    # Without zstandard, the zstd tool is the only way to read .zst.
+    external = threads > 0 or (suffix == ".zst" and zstandard is None)
+    if external and shutil.which(command[0]):
+        stream = Pipe(command, path)
+    elif suffix == ".gz":
+        stream = gzip.open(path, "rb")
+    elif suffix == ".xz":
+        stream = lzma.open(path, "rb")
+    elif zstandard is not None:
+        stream = io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True))
+    else:
+        raise ImportError(f"reading {path} needs the zstandard package (pip install zstandard)")
+    return io.TextIOWrapper(stream) if text else stream
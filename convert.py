@@ -0,0 +1,66 @@
+import argparse
+import os
+
+import cache
+import compressed
+import data_parse
+import e2e
+from path import ASB_PATH, ASB_E2E_PATH
+
+
+def parser_for(path):
+    """The parser of a log and the tag the loaders check its binary against."""
+    name = os.path.basename(path)
+    if name.startswith("time_"):
+        return data_parse.log_parser(stat=False), data_parse.tag
+    elif name.startswith("stat_"):
+        return data_parse.log_parser(stat=True), data_parse.tag
+    elif name.startswith("less-sender-"):
+        return e2e.parse_file, e2e.tag()
+    return None
+
+
+def logs(target):
+    if os.path.isfile(target):
+        yield target
+        return
+    for root, _, names in os.walk(target):
+        for name in sorted(names):
+            if compressed.plain(name).endswith(".log") and parser_for(name) is not None:
+                yield os.path.join(root, name)
+
+
+def convert(path, compress=False, force=False):
+    # A compressed log is stored next to the text log it is a copy of, where the loaders look.
+    log = compressed.plain(path)
+    parser, tag = parser_for(path)
+    if not force and cache.binary(log, tag) is not None:
+        return None
+    return cache.write_binary(log, parser(path), tag=tag, compress=compress)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert ASB time/stat logs and e2e metrics logs to binary traces.")
+    parser.add_argument("targets", nargs="*", help="log files or directories (default: both experiment folders)")
+    parser.add_argument("--folder", default="osdi23")
+    parser.add_argument("--compress", action="store_true", help="write compressed .npz instead of memory-mappable .npy")
+    parser.add_argument("--force", action="store_true", help="convert logs that already have an up-to-date binary")
+    parser.add_argument("--remove-text", action="store_true", help="delete each text log after converting it")
+    args = parser.parse_args()
+
+    targets = args.targets or [os.path.join(ASB_PATH, "paper_experiment", args.folder),
+                               os.path.join(ASB_E2E_PATH, "experiment_data/metrics", args.folder)]
+    for target in targets:
+        for path in logs(target):
+            stored = convert(path, compress=args.compress, force=args.force)
+            if stored is None:
+                print(f"{path}: up to date")
+                continue
+            before, after = os.path.getsize(path), os.path.getsize(stored)
+            print(f"{path}: {before / 2**20:.1f} MB -> {after / 2**20:.1f} MB ({before / max(after, 1):.1f}x)")
+            if args.remove_text:
+                os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,18 @@
+import io
+import mmap
 import re
 import numpy as np
 import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 
-from path import ASB_PATH
+import cache
+import compressed
+import records
+import timing
+import warmup
+from path import ASB_PATH, DOWNCAST
 
 pattern = "([ \d]{6,}): ([ \.\d]{7,}) s > ([ \d,]{7,}) ops, [ \.\d]{7,} us/op, ([ ,\d]{5,}) empty reads > Read amp ([ ,\.\d]{6,}), Write amp ([ ,\.\d]{6,}) > .*"
 stat_pattern = ".*> Cnt\ *(\d+), Avg\ *((\d+)|none|(\d+[km]))\. (.*)"
@@ -19,44 +29,216 @@ def parse_number(item):
     else:
         return float(item)
 
+# Compiled once. parse() only runs them on lines that pass a cheap substring check.
+summary_re = re.compile(pattern)
+stat_re = re.compile(r".*> Cnt\ *(\d+), Avg\ *(\d+[km]?|none)\. (.*)")
+pecentile_re = re.compile(r"\ *".join([rf"{n}:\ *(\d+[km]?|none)" for n in percentiles]))
+
+summary_mark = "empty reads > Read amp"
+read_size_mark = "Non-empty read size"
+write_size_mark = "Write size"
+
+# Columns of a parsed trace: epoch, time, tps, rempty, ra, wa, rn, rs, wn, ws,
+# then the read size and write size percentiles.
+width = 10 + 2 * len(percentiles)
+nan = float("nan")
+empty_pecentile = (nan,) * len(percentiles)
+
+def parse_numbers(items):
+    """Vectorized parse_number over a sequence of "<digits>[kmg]" or "none" tokens.
+
+    The tokens become a fixed-width byte matrix whose columns are folded into the values digit by digit,
+    so the Python-level work is one loop over the token width rather than over the tokens.
+    """
+    chars = np.asarray(items, dtype="S")
+    chars = chars.view(np.uint8).reshape(len(chars), chars.dtype.itemsize)
+    value = np.zeros(len(chars), dtype=np.int64)
+    scale = np.ones(len(chars))
+    ndigits = np.zeros(len(chars), dtype=np.int64)
+    for column in chars.T:
+        digit = column - np.uint8(48)
+        is_digit = digit < 10
+        value = np.where(is_digit, value * 10 + digit, value)
+        ndigits += is_digit
+        for suffix, factor in (("k", 1e3), ("m", 1e6), ("g", 1e9)):
+            scale[column == ord(suffix)] = factor
+    value = value * scale
+    value[ndigits == 0] = np.nan
+    return value
+
 def parse_pecentile(msg):
-    res = re.search(pecentile_pattern,msg).groups()
-    ans = np.array([parse_number(res[i]) for i in range(0,36,3)])
+    res = pecentile_re.search(msg).groups()
+    ans = parse_numbers(res)
     return ans
     
 
 def to_float(input):
     return float(input.replace(",","").replace(" ",""))
 
-def parse(file):
-    rn, rs, wn, ws, rempty = (None,) * 5
-    rc = np.full((12,), np.nan)
-    wc = np.full((12,), np.nan)
-    for line in file:
-        res = re.match(pattern,line)
-        if res:
-            epoch, time, tps, rempty, ra, wa = (to_float(x) for x in res.groups())
-            yield np.concatenate((np.array([epoch, time, tps, rempty, ra,wa,rn,rs,wn,ws]),rc,wc))
-            rn, rs, wn, ws, rempty = (None,) * 5
-            rc = np.full((12,), np.nan)
-            wc = np.full((12,), np.nan)
-        elif re.match(".*10:.*20:.*95:",line):  
-            res = re.match(stat_pattern,line).groups()
-            cnt = res[0]
-            avg = res[1]
-            msg = res[4]
-            if msg == "Non-empty read size":
-                rn = int(cnt)
-                rs = int(avg)
-                rc = parse_pecentile(line)
-            elif msg == "Write size":
-                wn = int(cnt)
-                ws = int(avg)
-                wc = parse_pecentile(line)
+# Percentile lines Parser decodes at once. Bounds the tokens it holds as str while feeding a large log.
+decode_batch = 4096
+
+
+class Parser:
+    """Incremental parser for time and stat logs.
+
+    feed() can be called repeatedly with consecutive lines of one log; the stat lines of an epoch that is not
+    closed yet are carried over to the next call. take() returns the epochs completed since the previous take()
+    as a (n_epochs, width) float64 matrix, one row per epoch summary line.
+
+    Percentile tokens are collected while feeding and decoded by flush() in batches of decode_batch lines,
+    each in one vectorized parse_numbers call scattered into the rc/wc columns.
+    """
+
+    def __init__(self):
+        self.state = (nan,) * 4 + (-1, -1)
+        self.tokens = []
+        self.start()
+
+    def start(self):
+        self.rows = array("d")
+        # Rows before this one have their percentiles decoded.
+        self.decoded = 0
+        # Per row from decoded on, the index of its read/write size percentiles in tokens (in units of a
+        # line), or -1.
+        self.rc_index = array("q")
+        self.wc_index = array("q")
+
+    def feed(self, lines):
+        rows, tokens = self.rows, self.tokens
+        rc_index, wc_index = self.rc_index, self.wc_index
+        rn, rs, wn, ws, rc, wc = self.state
+        limit = decode_batch * len(percentiles)
+        for line in lines:
+            if summary_mark in line:
+                res = summary_re.match(line)
+                if res:
+                    rows.extend([to_float(x) for x in res.groups()])
+                    rows.extend((rn, rs, wn, ws))
+                    rows.extend(empty_pecentile)
+                    rows.extend(empty_pecentile)
+                    rc_index.append(rc)
+                    wc_index.append(wc)
+                    rn, rs, wn, ws = (nan,) * 4
+                    rc = wc = -1
+                    continue
+
+            # Only the two size histograms are kept, everything else is skipped
+            # without running a regex.
+            body = line.rstrip("\n")
+            if body.endswith(read_size_mark) or body.endswith(write_size_mark):
+                res = stat_re.match(body)
+                pct = pecentile_re.search(body)
+                if res is None or pct is None:
+                    continue
+                cnt, avg, msg = res.groups()
+                if msg == read_size_mark:
+                    rn = int(cnt)
+                    rs = int(avg)
+                    rc = len(tokens) // len(percentiles)
+                    tokens.extend(pct.groups())
+                elif msg == write_size_mark:
+                    wn = int(cnt)
+                    ws = int(avg)
+                    wc = len(tokens) // len(percentiles)
+                    tokens.extend(pct.groups())
+                if len(tokens) >= limit:
+                    self.state = (rn, rs, wn, ws, rc, wc)
+                    self.flush()
+                    tokens, rc_index, wc_index = self.tokens, self.rc_index, self.wc_index
+                    rc, wc = self.state[4:]
+        self.state = (rn, rs, wn, ws, rc, wc)
+        return self
+
+    def flush(self):
+        """Decodes the percentiles collected so far into the rows of the closed epochs. The epoch still open
+        keeps its tokens."""
+        tokens, rc_index, wc_index = self.tokens, self.rc_index, self.wc_index
+        rn, rs, wn, ws, rc, wc = self.state
+        n = len(percentiles)
+        self.tokens = []
+        moved = []
+        for i in (rc, wc):
+            if i >= 0:
+                moved.append(len(self.tokens) // n)
+                self.tokens.extend(tokens[i * n:(i + 1) * n])
             else:
-                pass
-        else:
-            pass
+                moved.append(-1)
+        self.state = (rn, rs, wn, ws, *moved)
+        self.rc_index = array("q")
+        self.wc_index = array("q")
+
+        count = len(self.rows) // width
+        if len(tokens) > 0 and count > self.decoded:
+            with timing.span("asb decode"):
+                values = parse_numbers(tokens).reshape(-1, n)
+                # A view of the buffer, released before the buffer grows again.
+                matrix = np.frombuffer(self.rows, dtype=np.float64).reshape(-1, width)[self.decoded:]
+                for index, column in ((rc_index, 10), (wc_index, 10 + n)):
+                    index = np.frombuffer(index, dtype=np.int64)
+                    has = index >= 0
+                    matrix[has, column:column + n] = values[index[has]]
+                del matrix
+        self.decoded = count
+
+    def take(self):
+        self.flush()
+        # The buffer becomes the matrix without a copy, a fresh one collects the next rows.
+        matrix = np.frombuffer(self.rows, dtype=np.float64).reshape(-1, width)
+        self.start()
+        return matrix
+
+
+def parse(file):
+    """Parses a whole time or stat log, see Parser."""
+    return Parser().feed(file).take()
+
+
+# Changes with the parser, so that traces cached or converted by an older one are parsed again.
+tag = cache.version(pattern, stat_re.pattern, pecentile_re.pattern, str(percentiles), parse_numbers, to_float, Parser)
+
+
+# Bytes Tail.poll reads at a time, so a tail started far behind a long run does not hold the whole log.
+tail_block = 4 << 20
+
+
+class Tail:
+    """Follows a log that is still being written, remembering how far it has been read."""
+
+    def __init__(self, path):
+        self.path = path
+        self.offset = 0
+        self.parser = Parser()
+
+    def poll(self):
+        """Returns the epochs completed since the previous poll, parsing only the bytes appended in between."""
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return self.parser.take()
+        with f:
+            if os.fstat(f.fileno()).st_size < self.offset:
+                # The benchmark restarted and rewrote the log.
+                self.offset = 0
+                self.parser = Parser()
+            size = tail_block
+            while True:
+                f.seek(self.offset)
+                block = f.read(size)
+                # A trailing partial line is left for the next block or poll.
+                end = block.rfind(b"\n") + 1
+                if end == 0:
+                    if len(block) < size:
+                        break
+                    # A line longer than a block, read it again with a larger one.
+                    size *= 2
+                    continue
+                self.offset += end
+                size = tail_block
+                # The same decoding and newline handling as the text-mode file parse_file reads.
+                with io.TextIOWrapper(io.BytesIO(block[:end])) as text:
+                    self.parser.feed(text)
+        return self.parser.take()
 
 
 def path(authdb, keys, folder="osdi23", stat=False, low_mem=False, high_mem=0):
@@ -71,54 +253,466 @@ def path(authdb, keys, folder="osdi23", stat=False, low_mem=False, high_mem=0):
             return f"paper_experiment/{folder}/time_{authdb}_{keys}.log"
         
 
-def load(authdb, keys, folder="osdi23", low_mem=False, only_time=False):
-    with open(os.path.join(ASB_PATH, path(authdb, keys, folder, low_mem=low_mem))) as f:
-        data_time = np.array(list(parse(f)))  
-        if only_time:
-            return Data(data_time,skip_start=(keys!="real"))
-        
-    with open(os.path.join(ASB_PATH, path(authdb, keys, folder, stat=True, low_mem=low_mem))) as f:
-        data_stat = np.array(list(parse(f))) 
-        return Data(data_time,data_stat,skip_start=(keys!="real"))
+name_re = re.compile(r"(time|stat)_([^_]+)_([^_]+?)(?:_(lowmem|highmem\d+))?\.(log(?:\.gz|\.xz|\.zst)?|npy|npz)$")
+
+
+def parse_path(name):
+    """Inverse of path for a file name: returns (kind, authdb, keys, variant), or None for other files.
+
+    kind is "time" or "stat"; variant is "" for the default memory setting, "lowmem" or "highmem<N>".
+    """
+    res = name_re.match(name)
+    if res is None:
+        return None
+    kind, authdb, keys, variant, _ = res.groups()
+    return kind, authdb, keys, variant or ""
+
+
+def parse_file(path):
+    with compressed.open_log(path) as f, timing.span("asb parse", path) as info:
+        if not timing.enabled:
+            return parse(f)
+        lines = timing.Lines(f)
+        data = parse(lines)
+        info["lines"] = lines.count
+        return data
+
+
+# Smallest byte range worth a worker in parse_file_parallel.
+min_range = 16 << 20
+
+
+def boundaries(buf, parts):
+    """Offsets that split buf into about `parts` ranges, each starting right after a summary line.
+
+    The parser state after a summary line is the state of a fresh Parser, so the ranges parse independently
+    and their rows concatenate to the rows of the whole log.
+    """
+    mark = summary_mark.encode()
+    result = [0]
+    for part in range(1, parts):
+        pos = max(len(buf) * part // parts, result[-1])
+        while True:
+            pos = buf.find(mark, pos)
+            if pos < 0:
+                break
+            start = buf.rfind(b"\n", 0, pos) + 1
+            end = buf.find(b"\n", pos)
+            end = len(buf) if end < 0 else end + 1
+            # A line that only mentions the mark does not close an epoch.
+            if summary_re.match(buf[start:end].decode()):
+                break
+            pos = end
+        if pos < 0:
+            break
+        if end > result[-1]:
+            result.append(end)
+    if result[-1] < len(buf):
+        result.append(len(buf))
+    return result
+
+
+def parse_range(job):
+    path, start, end = job
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+        # The same decoding and newline handling as the text-mode file parse_file reads.
+        with io.TextIOWrapper(io.BytesIO(buf[start:end])) as text:
+            return parse(text)
+
+
+def parse_file_parallel(path, workers=None):
+    """parse_file with the log split into byte ranges that are parsed in a process pool (see boundaries).
+
+    The result is identical to parse_file. Logs too small to give every worker min_range bytes use fewer,
+    and compressed logs, which cannot be split, are parsed serially.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    size = os.path.getsize(path)
+    parts = min(workers, size // min_range)
+    if parts <= 1 or compressed.plain(path) != path:
+        return parse_file(path)
+    with timing.span("asb parse", path), open(path, "rb") as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+        offsets = boundaries(buf, parts)
+        jobs = [(path, start, end) for (start, end) in zip(offsets[:-1], offsets[1:])]
+        with ProcessPoolExecutor(len(jobs)) as pool:
+            return np.concatenate(list(pool.map(parse_range, jobs)))
+
+
+def variant(low_mem=False, high_mem=0):
+    """Name of a memory setting as it appears in file names: "", "lowmem" or "highmem<N>"."""
+    if low_mem:
+        return "lowmem"
+    elif high_mem > 0:
+        return f"highmem{high_mem}"
+    return ""
+
+
+def memory(variant):
+    """Inverse of variant: the low_mem and high_mem arguments of path and load."""
+    if variant == "lowmem":
+        return dict(low_mem=True, high_mem=0)
+    elif variant.startswith("highmem"):
+        return dict(low_mem=False, high_mem=int(variant[len("highmem"):]))
+    return dict(low_mem=False, high_mem=0)
+
+
+class Directory:
+    """Index of the traces in one experiment folder, built from a single listing of the directory.
+
+    Text logs and binary traces are both indexed, so membership tells whether load_trace can succeed
+    without opening anything.
+    """
+
+    def __init__(self, folder="osdi23"):
+        self.folder = folder
+        self.path = os.path.join(ASB_PATH, "paper_experiment", folder)
+        self.traces = set()
+        try:
+            self.mtime = os.stat(self.path).st_mtime_ns
+            names = os.listdir(self.path)
+        except FileNotFoundError:
+            self.mtime = None
+            names = []
+        for name in names:
+            parsed = parse_path(name)
+            if parsed is not None:
+                self.traces.add(parsed)
+
+    def fresh(self):
+        try:
+            return os.stat(self.path).st_mtime_ns == self.mtime
+        except FileNotFoundError:
+            return self.mtime is None
+
+    def has(self, authdb, keys, stat=False, low_mem=False, high_mem=0):
+        return parse_path(os.path.basename(path(authdb, keys, self.folder, stat, low_mem, high_mem))) in self.traces
+
+    def variants(self, authdb, keys):
+        """Memory settings the time log of (authdb, keys) was recorded with, default first."""
+        found = [v for (kind, db, k, v) in self.traces if (kind, db, k) == ("time", authdb, keys)]
+        return sorted(found, key=lambda v: (v != "", v != "lowmem", len(v), v))
+
+
+directories = {}
+
+
+def directory(folder="osdi23"):
+    """The Directory of `folder`, listed again only when files were added to or removed from it."""
+    index = directories.get(folder)
+    if index is None or not index.fresh():
+        index = directories[folder] = Directory(folder)
+    return index
+
+
+# Columns of a time log beyond these are always nan, the stat fields only come from stat logs.
+time_width = 6
+
+
+def time_columns(parser, path):
+    return np.ascontiguousarray(parser(path)[:, :time_width])
+
+
+def log_parser(stat=False, workers=1):
+    """The parser of a stat or time log. Time logs keep only their first time_width columns, so cached time
+    logs have the layout of the binaries convert.py writes. With workers > 1 a log is split across that many
+    processes, see parse_file_parallel."""
+    parser = parse_file if workers <= 1 else partial(parse_file_parallel, workers=workers)
+    return parser if stat else partial(time_columns, parser)
+
+
+def load_trace(authdb, keys, folder="osdi23", stat=False, low_mem=False, high_mem=0, workers=1):
+    """The parsed log, from the cache or a binary copy if possible. With workers > 1 a log that has to be
+    parsed is split across that many processes, see parse_file_parallel."""
+    log = os.path.join(ASB_PATH, path(authdb, keys, folder, stat=stat, low_mem=low_mem, high_mem=high_mem))
+    parser = log_parser(stat, workers)
+    with timing.span("asb load", log):
+        return cache.load(log, parser, tag=tag)
+
+
+def load(authdb, keys, folder="osdi23", low_mem=False, only_time=False, lazy=False, high_mem=0, warmup=None,
+         downcast=DOWNCAST):
+    if lazy:
+        return LazyData(authdb, keys, folder, low_mem=low_mem, high_mem=high_mem, warmup=warmup, downcast=downcast)
+    data = Data(load_trace(authdb, keys, folder, low_mem=low_mem, high_mem=high_mem), skip_start=(keys!="real"),
+                warmup=warmup, downcast=downcast)
+    if not only_time:
+        data.add_stat(load_trace(authdb, keys, folder, stat=True))
+    return data
+
+
+class Missing:
+    """Returned by the batch loaders in place of a trace whose log does not exist."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def __bool__(self):
+        return False
+
+    def __repr__(self):
+        return f"Missing({self.path!r})"
+
+
+class Corrupt(Missing):
+    """Returned by the batch loaders in place of a trace whose log exists but cannot be parsed into epochs."""
+
+    def __init__(self, path, error):
+        super().__init__(path)
+        self.error = error
+
+    def __repr__(self):
+        return f"Corrupt({self.path!r}, {self.error!r})"
+
+
+def present(data):
+    """False for a Missing marker, True for loaded data. A Corrupt marker raises, so callers that leave
+    missing traces out of a figure do not hide traces that exist but cannot be parsed."""
+    if isinstance(data, Corrupt):
+        raise ValueError(f"corrupt trace {data.path}: {data.error}")
+    return bool(data)
+
+
+def try_load_trace(job, workers=1):
+    try:
+        trace = np.asarray(load_trace(*job, workers=workers))
+    except FileNotFoundError as e:
+        return Missing(e.filename)
+    except Exception as e:
+        return Corrupt(os.path.join(ASB_PATH, path(*job)), f"{type(e).__name__}: {e}")
+    if len(trace) == 0:
+        return Corrupt(os.path.join(ASB_PATH, path(*job)), "no epochs")
+    return trace
+
+
+def splittable(job, workers):
+    """Whether parse_file_parallel splits the log of `job` across more than one of `workers`."""
+    log = compressed.locate(os.path.join(ASB_PATH, path(*job)))
+    try:
+        size = os.path.getsize(log)
+    except OSError:
+        return False
+    return compressed.plain(log) == log and min(workers, size // min_range) > 1
+
+
+def load_traces(jobs, workers=None):
+    """Runs load_trace for each (authdb, keys, folder, stat, low_mem, high_mem) job in a process pool.
+
+    Jobs whose trace is not in the Directory of their folder are answered with a Missing marker up front,
+    without opening the file, and traces that exist but do not parse with a Corrupt one. Logs large enough
+    for parse_file_parallel to split are loaded after the others, one after another, each split across all
+    workers. Returns the parsed matrices, or the markers, in the order of `jobs`.
+    """
+    jobs = list(jobs)
+    result = [None] * len(jobs)
+    todo = []
+    for idx, job in enumerate(jobs):
+        authdb, keys, folder, *setting = job
+        if directory(folder).has(authdb, keys, *setting):
+            todo.append(idx)
+        else:
+            result[idx] = Missing(os.path.join(ASB_PATH, path(*job)))
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    large = [idx for idx in todo if workers > 1 and splittable(jobs[idx], workers)]
+    small = [idx for idx in todo if idx not in large]
+    if workers <= 1 or len(small) <= 1:
+        traces = [try_load_trace(jobs[idx]) for idx in small]
+    else:
+        with ProcessPoolExecutor(min(workers, len(small))) as pool:
+            traces = list(pool.map(try_load_trace, [jobs[idx] for idx in small]))
+    traces += [try_load_trace(jobs[idx], workers) for idx in large]
+    for idx, trace in zip(small + large, traces):
+        result[idx] = trace
+    return result
+
+
+def requests_of(requests, folder="osdi23", low_mem=False, high_mem=0):
+    """Completes (authdb, keys[, folder[, variant]]) requests to 4-tuples, defaulting the memory setting to
+    the one given by low_mem and high_mem."""
+    default = (folder, variant(low_mem, high_mem))
+    return [(tuple(req) + default[len(req) - 2:])[:4] for req in requests]
+
+
+def load_many(requests, folder="osdi23", low_mem=False, only_time=False, workers=None, high_mem=0):
+    """Batch version of load for (authdb, keys[, folder[, variant]]) requests, variant being a memory
+    setting as returned by variant() or Directory.variants().
+
+    The logs are parsed in parallel. Returns Data objects, or Missing/Corrupt markers, in input order.
+    """
+    requests = requests_of(requests, folder, low_mem, high_mem)
+    jobs = [(authdb, keys, f, False, *memory(v).values()) for (authdb, keys, f, v) in requests]
+    if not only_time:
+        jobs += [(authdb, keys, f, True) for (authdb, keys, f, v) in requests]
+    traces = load_traces(jobs, workers)
+
+    result = []
+    for idx, (authdb, keys, f, v) in enumerate(requests):
+        time = traces[idx]
+        stat = None if only_time else traces[len(requests) + idx]
+        if isinstance(time, Missing):
+            result.append(time)
+        elif isinstance(stat, Missing):
+            result.append(stat)
+        else:
+            result.append(Data(time, stat, skip_start=(keys!="real")))
+    return result
 
     
     
+def default_warmup(skip_start):
+    # The synthetic key sets drop the first half of the epochs, the real trace only its first 10.
+    return warmup.Fraction(0.5) if skip_start else warmup.Prefix(10)
+
+
+# Columns of a parsed trace kept by Data, the time log's and the stat log's. Percentiles are subarray fields.
+time_fields = [("epoch", 0), ("timer", 1), ("tps", 2), ("rempty", 3), ("ra", 4), ("wa", 5)]
+stat_fields = [("rn", 6), ("rs", 7), ("wn", 8), ("ws", 9), ("rc", slice(10, 10+12)), ("wc", slice(10+12, 10+24))]
+
+
 class Data:
-    def __init__(self, time, stat=None, skip_start=True):
-        data = time.T
-        if skip_start:
-            max_epoch = np.max(data[0])
-            mask = data[0] >= max_epoch/2
-            data = data[:,mask]
-        else:
-            data = data[:,10:]
-        self.epoch = data[0]
-        self.timer = data[1]
-        
-        self.tps = data[2]
-        self.rempty = data[3]
-        self.ra = data[4]
-        self.wa = data[5]
-        
+    __slots__ = ("skip_start", "warmup", "downcast", "frozen", "first_epoch", "time", "stat")
+
+    def __init__(self, time, stat=None, skip_start=True, warmup=None, downcast=DOWNCAST):
+        self.frozen = False
+        self.skip_start = skip_start
+        self.warmup = warmup if warmup is not None else default_warmup(skip_start)
+        self.downcast = downcast
+        self.time = self.trim(time)
+        self.stat = None
+        if stat is not None:
+            self.add_stat(stat)
+
+    def trim(self, trace):
+        # The warm-up epochs are dropped and the columns Data reads are packed into one structured array.
+        start = self.warmup.start(trace)
+        self.first_epoch = trace[start, 0] if start < len(trace) else np.inf
+        trace = trace[start:]
+        return records.pack([(name, trace[:, idx]) for (name, idx) in time_fields], self.downcast, exact=("timer",))
+
+    def trim_stat(self, trace):
+        # The stat log is cut at the same epoch as the time log.
+        trace = trace[np.searchsorted(trace[:,0], self.first_epoch, side="left"):]
+        return records.pack([(name, trace[:, idx]) for (name, idx) in stat_fields], self.downcast)
+
+    def arrays(self):
+        return [a for a in (self.time, self.stat) if a is not None]
+
+    def freeze(self):
+        """Makes the arrays read-only, and those loaded later too."""
+        self.frozen = True
+        for a in self.arrays():
+            a.flags.writeable = False
+
+    def keep(self, array):
+        array.flags.writeable = not self.frozen
+        return array
+
+    @property
+    def has_stat(self):
+        return self.stat is not None
+
+    def add_stat(self, stat):
+        self.stat = self.keep(self.trim_stat(stat))
+
+    @property
+    def epoch(self):
+        return records.column(self.time, "epoch")
+
+    @property
+    def timer(self):
+        return records.column(self.time, "timer")
+
+    @property
+    def tps(self):
+        return records.column(self.time, "tps")
+
+    @property
+    def rempty(self):
+        return records.column(self.time, "rempty")
+
+    @property
+    def ra(self):
+        return records.column(self.time, "ra")
+
+    @property
+    def wa(self):
+        return records.column(self.time, "wa")
+
+    @property
+    def latency(self):
         T = self.timer
         T = np.concatenate([[0],T])
-        self.latency = T[1:]-T[:-1]
-        
-        if stat is None:
-            return
-        
-        
-        data = stat.T
-        if skip_start:
-            mask = data[0] >= max_epoch/2
-            data = data[:,mask]
-        else:
-            data = data[:,10:]
-        
-        self.rn = data[6]
-        self.rs = data[7]
-        self.wn = data[8]
-        self.ws = data[9]
-        self.rc = data[10:10+12]
-        self.wc = data[10+12:10+24]
-    
\ No newline at end of file
+        return T[1:]-T[:-1]
+
+    @property
+    def rn(self):
+        return records.column(self.stat, "rn")
+
+    @property
+    def rs(self):
+        return records.column(self.stat, "rs")
+
+    @property
+    def wn(self):
+        return records.column(self.stat, "wn")
+
+    @property
+    def ws(self):
+        return records.column(self.stat, "ws")
+
+    @property
+    def rc(self):
+        return records.column(self.stat, "rc").T
+
+    @property
+    def wc(self):
+        return records.column(self.stat, "wc").T
+
+
+class LazyData(Data):
+    """Data that reads its logs on first use.
+
+    The time log is parsed when a time column is first read, the stat log only when a stat column is, so
+    callers need not decide on only_time up front and pay only for the columns they touch.
+    """
+
+    __slots__ = ("source", "low_mem", "high_mem", "_time", "_stat")
+
+    def __init__(self, authdb, keys, folder="osdi23", low_mem=False, high_mem=0, warmup=None, downcast=DOWNCAST):
+        self.frozen = False
+        self.source = (authdb, keys, folder)
+        self.low_mem = low_mem
+        self.high_mem = high_mem
+        self.skip_start = keys != "real"
+        self.warmup = warmup if warmup is not None else default_warmup(self.skip_start)
+        self.downcast = downcast
+        self._time = None
+        self._stat = None
+
+    @property
+    def time(self):
+        if self._time is None:
+            self._time = self.keep(self.trim(load_trace(*self.source, low_mem=self.low_mem, high_mem=self.high_mem)))
+        return self._time
+
+    @property
+    def stat(self):
+        if self._stat is None:
+            # The warm-up cut of the stat log depends on the time log.
+            self.time
+            self._stat = self.keep(self.trim_stat(load_trace(*self.source, stat=True)))
+        return self._stat
+
+    def arrays(self):
+        return [a for a in (self._time, self._stat) if a is not None]
+
+    @property
+    def has_stat(self):
+        return self._stat is not None
+
+    def add_stat(self, stat):
+        self.time
+        self._stat = self.keep(self.trim_stat(stat))
@@ -1,42 +1,128 @@
 import re
 import numpy as np
-from path import ASB_E2E_PATH
+import cache
+import compressed
+import records
+import timing
+import warmup
+from data_parse import Corrupt, Missing
+from path import ASB_E2E_PATH, DOWNCAST
 
 import os
+from concurrent.futures import ProcessPoolExecutor
 
 
-def metrics_loader(path):
-    timestamp = None
-    lines = []
-    with open(path) as f:
-        for line in f.readlines():
-            res = re.match("(\d*),.*", line)
-            if res is None:
-                break
-            line_timestamp = int(res.groups()[0])
-            if timestamp is None:
-                timestamp = line_timestamp
-            if timestamp == line_timestamp:
-                lines.append(line)
-            else:
-                yield (timestamp, "\n".join(lines))
-                lines = [line]
-                timestamp = line_timestamp
+def metrics_loader(path, chunk_size=1 << 22):
+    """Yields (timestamp, record) for each run of consecutive lines sharing a timestamp.
 
-    yield (timestamp, "".join(lines))
+    The file is read in binary chunks and split with plain bytes operations. Each record is a memoryview
+    of the chunk it was read from, so only the group left unfinished at the end of a chunk is copied.
+    """
+    with compressed.open_log(path, text=False) as f:
+        buf = b""
+        timestamp = None
+        start = pos = 0
+        eof = False
+        while not eof:
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            # Keep the unfinished group, the next chunk may continue it.
+            buf = buf[start:] + chunk
+            pos -= start
+            start = 0
+            view = memoryview(buf)
+            while pos < len(buf):
+                end = buf.find(b"\n", pos)
+                if end < 0:
+                    if not eof:
+                        break
+                    end = len(buf)
+                comma = buf.find(b",", pos, end)
+                if comma < 0 or not buf[pos:comma].isdigit():
+                    # Not a metrics line, the log ends here.
+                    eof = True
+                    break
+                line_timestamp = int(buf[pos:comma])
+                if line_timestamp != timestamp:
+                    if timestamp is not None:
+                        yield (timestamp, view[start:pos])
+                    start = pos
+                    timestamp = line_timestamp
+                pos = end + 1
+
+        if timestamp is not None:
+            yield (timestamp, view[start:pos])
 
 
 class Pattern:
     def __init__(self, group, name, meter="count"):
-        self.pattern = f"(^|(?<=\n))\d*, {group}, Group, \x7b.*{name}\.{meter}: (\d+),"
+        self.group = group
+        self.key = f"{name}.{meter}"
+        self.pattern = re.compile(f"(^|(?<=\n))\\d*, {group}, Group, \x7b.*{name}\\.{meter}: (\\d+),".encode())
 
     def extract(self, record):
-        res = re.search(self.pattern, record)
+        res = self.pattern.search(record)
         if res is None:
             return float(0)
         else:
             return float(res.groups()[1])
 
+    def __repr__(self):
+        return f"Pattern({self.group!r}, {self.key!r})"
+
+
+# A metrics line "<ts>, <group>, Group, {<key>: <value>, ...}".
+line_re = re.compile(rb"^[^,\n]*, ([^,\n]*), Group, ([^\n]*)", re.M)
+
+
+class Extractor:
+    """Resolves a list of Pattern-like specs (anything with .group and .key) in one pass over a record.
+
+    Each line "<ts>, <group>, Group, {<key>: <value>, ...}" is matched once. Lines of groups no spec asks for
+    are skipped after the group name, so adding a metric does not add another scan of the record.
+    """
+
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        # Names of the columns parse_file returns, the timestamp first.
+        self.columns = ["time"] + [p.key for p in self.patterns]
+        self.wanted = {}
+        for p in self.patterns:
+            self.wanted.setdefault(p.group.encode(), set()).add(p.key.encode())
+        self.keys = [(p.group.encode(), p.key.encode()) for p in self.patterns]
+        # Per group, a search for the "<key>: <integer>" item of each wanted key. Each starts with the key, so
+        # the regex engine scans for it as a literal.
+        self.items = {group: [(key, re.compile(re.escape(key) + rb": (\d+)(?=, |\}|$)", re.M)) for key in sorted(keys)]
+                      for group, keys in self.wanted.items()}
+
+    def extract(self, record):
+        # The record is searched in place: only group names, wanted keys and their values are copied out.
+        found = {}
+        for line in line_re.finditer(record):
+            group = line.group(1)
+            items = self.items.get(group)
+            if items is None:
+                continue
+            start, end = line.span(2)
+            for key, item in items:
+                if (group, key) in found:
+                    continue
+                pos = start
+                while True:
+                    res = item.search(record, pos, end)
+                    if res is None:
+                        break
+                    # A whole item, not the tail of a longer key.
+                    if record[res.start() - 1] in b"{ ":
+                        found[(group, key)] = float(res.group(1))
+                        break
+                    pos = res.end()
+        return [found.get(key, float(0)) for key in self.keys]
+
+    def tag(self):
+        """Identifies the extracted columns, so cached traces are not reused after the list changes."""
+        return ",".join(f"{p.group}/{p.key}" for p in self.patterns)
+
 
 patterns = [
     Pattern("system_metrics", "good_tps"),  # 1
@@ -49,62 +135,213 @@ patterns = [
     Pattern("timer", "consensus::handle_epoch_execution"),  # 8
     Pattern("debug", "debug"),  # 9
 ]
+extractor = Extractor(patterns)
+
 
+def parse_file(path, extractor=extractor):
+    with timing.span("e2e parse", path) as info:
+        records = metrics_loader(path)
+        data = np.array([[timestamp, *extractor.extract(record)] for (timestamp, record) in records], dtype=float)
+        info["records"] = len(data)
+        return data.reshape(-1, 1 + len(extractor.patterns))
 
-def load(ty, size, erc20=False, folder="osdi23"):
+
+# Changes with the parser, so that traces cached or converted by an older one are parsed again.
+parser_version = cache.version(metrics_loader, Extractor, parse_file)
+
+
+def tag(extractor=extractor):
+    """Cache tag of traces parsed by parse_file with `extractor`: its columns and the parser version."""
+    return f"{extractor.tag()}/{parser_version}"
+
+
+def path(ty, size, erc20=False, folder="osdi23"):
     if erc20:
         task = "erc20"
     else:
         task = "native"
 
-    path = "experiment_data/metrics/{folder}/less-sender-{task}-{ty}-{size}.log".format(
+    return "experiment_data/metrics/{folder}/less-sender-{task}-{ty}-{size}.log".format(
         ty=ty, size=size, folder=folder, task=task)
-    records = list(metrics_loader(os.path.join(ASB_E2E_PATH, path)))
-    return Data(np.array([[timestamp, *[p.extract(record) for p in patterns]] for (timestamp, record) in records]))
+
+
+name_re = re.compile(r"less-sender-(native|erc20)-(.+)-([^-]+)\.(log(?:\.gz|\.xz|\.zst)?|npy|npz)$")
+
+
+def parse_path(name):
+    """Inverse of path for a file name: returns (ty, size, erc20), or None for other files."""
+    res = name_re.match(name)
+    if res is None:
+        return None
+    task, ty, size, _ = res.groups()
+    return ty, size, task == "erc20"
+
+
+def runs(folder="osdi23"):
+    """(ty, size, erc20) of every run in `folder`, from one listing of the directory."""
+    try:
+        names = os.listdir(os.path.join(ASB_E2E_PATH, "experiment_data/metrics", folder))
+    except FileNotFoundError:
+        return set()
+    return {parse_path(name) for name in names} - {None}
+
+
+def load(ty, size, erc20=False, folder="osdi23", warmup=None, downcast=DOWNCAST):
+    log = os.path.join(ASB_E2E_PATH, path(ty, size, erc20, folder))
+    with timing.span("e2e load", log):
+        return Data(cache.load(log, parse_file, tag=tag()), warmup=warmup, downcast=downcast)
+
+
+def try_load(request):
+    ty, size, erc20, folder = request
+    try:
+        data = load(ty, size, erc20=erc20, folder=folder)
+    except FileNotFoundError as e:
+        return Missing(e.filename)
+    except Exception as e:
+        return Corrupt(os.path.join(ASB_E2E_PATH, path(*request)), f"{type(e).__name__}: {e}")
+    if data.samples is None:
+        return Corrupt(os.path.join(ASB_E2E_PATH, path(*request)), "no metrics")
+    return data
+
+
+def load_many(requests, folder="osdi23", workers=None):
+    """Batch version of load for (ty, size[, erc20[, folder]]) requests, parsed in a process pool.
+
+    Runs not listed in their folder are answered with a data_parse.Missing marker without opening the file,
+    and runs that exist but do not parse with a data_parse.Corrupt one. Returns Data objects, or the markers,
+    in input order.
+    """
+    requests = [(tuple(req) + (False, folder)[len(req) - 2:])[:4] for req in requests]
+    listed = {f: runs(f) for f in {req[3] for req in requests}}
+    result = [None] * len(requests)
+    todo = []
+    for idx, (ty, size, erc20, f) in enumerate(requests):
+        if (ty, size, erc20) in listed[f]:
+            todo.append(idx)
+        else:
+            result[idx] = Missing(os.path.join(ASB_E2E_PATH, path(ty, size, erc20, f)))
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(todo))
+    if workers <= 1:
+        loaded = [try_load(requests[idx]) for idx in todo]
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            loaded = list(pool.map(try_load, [requests[idx] for idx in todo]))
+    for idx, data in zip(todo, loaded):
+        result[idx] = data
+    return result
+
+
+# The debug counter is set when the benchmark proper starts, the first 10 seconds after it are dropped.
+default_warmup = warmup.Offset(10000, column=0, mark=-1)
 
 
 class Data:
-    def __init__(self, data):
-        data = data.T
-        if len(data[0]) == 0:
-            return
+    __slots__ = ("columns", "start", "samples")
 
-        # Truncate the prefix of warmup
-        DT = data[1, 1:] - data[1][:-1]
-        zeros = np.where(DT < 1)[0]
-        start_index = 0
-        if len(zeros) > 0:
-            start_index = zeros[-1] + 1
+    def __init__(self, data, warmup=None, extractor=extractor, downcast=DOWNCAST):
+        self.columns = extractor.columns
+        self.samples = None
+        if len(data) == 0:
+            return
+        start = (warmup or default_warmup).start(data)
+        if start == len(data):
+            raise ValueError("no samples after the warm-up")
+        data = data[start:]
+        # Absolute timestamp (ms) of the first sample kept.
+        self.start = data[0, 0]
+        # Columns are stored relative to the first sample kept, which keeps the counters small enough for
+        # integer types.
+        self.samples = records.pack([(name, data[:, idx] - data[0, idx]) for idx, name in enumerate(self.columns)],
+                                    downcast, exact=("time",))
 
-        mark_index = np.where(data[-1] >= 1)[0][0]
-        # skip first 10 seconds
-        start_index = np.where(data[0] > data[0, mark_index] + 10000)[0][0]
-        end_index = np.where(data[0] < data[0, -1] - 10000)[0][-1]
+    def arrays(self):
+        return [] if self.samples is None else [self.samples]
 
-        data = data.T
-        data = data[start_index:]
-        data -= data[0]
-        data = data.T
+    def freeze(self):
+        for a in self.arrays():
+            a.flags.writeable = False
 
-        data[0] /= 1e3
+    @property
+    def data(self):
+        """ The samples as columns relative to the first one, with timestamps in seconds (a new array). """
+        return np.array([self.series(col) for col in range(len(self.columns))])
 
-        self.data = data
+    def series(self, col):
+        """ Column `col` relative to the first sample, timestamps in seconds. """
+        if col == 0:
+            return self.timestamp
+        return records.column(self.samples, self.columns[col])
 
     @property
     def timestamp(self):
-        return self.data[0]
-
-    def data(self, col):
-        return self.data[col]
+        return self.samples["time"] / 1e3
 
     def mean(self, col):
-        return self.data[col, -1] / self.data[0, -1]
+        last = np.array([self.samples[self.columns[c]][-1] for c in np.atleast_1d(col)], dtype=float)
+        return last.reshape(np.shape(col)) / (self.samples["time"][-1] / 1e3)
 
     def rate(self, col):
-        A = self.data[col]
-        T = self.data[0]
+        A = self.series(col)
+        T = self.timestamp
         return np.divide(A[1:]-A[:-1], T[1:]-T[:-1])
 
+    def column(self, col):
+        """ A cumulative column, or the sum of several for a list of columns. """
+        return np.atleast_2d([self.series(c) for c in np.atleast_1d(col)]).sum(axis=0)
+
+    def window_start(self, window):
+        """ For every sample, the index of the latest sample at least `window` seconds before it (the first
+        sample near the start of the run). """
+        T = self.timestamp
+        return np.maximum(np.searchsorted(T, T - window, side="right") - 1, 0)
+
+    def rolling_rate(self, col, window=10):
+        """ Rate of cumulative column(s) `col` over the trailing `window` seconds at every sample. The columns
+        are cumulative, so each window is one difference whatever its length. """
+        A = self.column(col)
+        T = self.timestamp
+        start = self.window_start(window)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.divide(A - A[start], T - T[start])
+
+    def rolling_tps(self, window=10):
+        return self.rolling_rate(1, window)
+
+    def rolling_latency(self, col, window=10):
+        """ Time (us) spent in timer column(s) `col` per transaction over the trailing `window` seconds, the
+        windowed version of the breakdown figures. Columns 2, 3 and 4 are storage::get, set and commit. """
+        A = self.column(col)
+        N = self.series(1)
+        start = self.window_start(window)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.divide(A - A[start], N - N[start]) / 1e3
+
+    def window_percentiles(self, q=(50, 99), window=60, values=None):
+        """ Percentiles of per-sample values (default: tps) in consecutive `window`-second windows.
+
+        Returns the start time of every window and a len(q) x windows array, interpolated like np.percentile.
+        All windows come from one sort of the samples by (window, value). """
+        if values is None:
+            values = self.tps
+        T = self.timestamp[-len(values):]
+        keep = ~np.isnan(values)
+        values, group = values[keep], (T[keep] // window).astype(np.int64)
+        if len(values) == 0:
+            return np.empty(0), np.empty((len(q), 0))
+
+        order = np.lexsort((values, group))
+        values, group = values[order], group[order]
+        starts = np.flatnonzero(np.diff(group, prepend=group[0] - 1))
+        counts = np.diff(np.append(starts, len(values)))
+        pos = starts + np.asarray(q, dtype=float)[:, None] / 100 * (counts - 1)
+        low = np.floor(pos).astype(np.int64)
+        high = np.ceil(pos).astype(np.int64)
+        return group[starts] * window, values[low] + (values[high] - values[low]) * (pos - low)
+
     @property
     def tps(self):
         return self.rate(1)
@@ -115,4 +352,4 @@ class Data:
 
     @property
     def goodput(self):
-        return self.data(1)
+        return self.series(1)
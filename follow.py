@@ -0,0 +1,97 @@
+import argparse
+import os
+import time
+
+import numpy as np
+from matplotlib import pyplot as plt
+
+from data_parse import Tail, path
+from path import ASB_PATH
+from plot import LinePlot
+
+time_columns = {"tps": 2, "ra": 4, "wa": 5}
+stat_columns = {"rs": 7, "ws": 9}
+
+
+class Aggregate:
+    """Running means over every epoch seen so far and over the last `window` epochs, updated per batch of rows."""
+
+    def __init__(self, columns, window=100):
+        self.columns = columns
+        self.index = list(columns.values())
+        self.window = window
+        self.epochs = 0
+        self.total = np.zeros(len(columns))
+        self.recent = np.empty((0, len(columns)))
+
+    def update(self, rows):
+        values = rows[:, self.index]
+        self.epochs += len(values)
+        self.total += np.nansum(values, axis=0)
+        self.recent = np.concatenate([self.recent, values])[-self.window:]
+
+    def mean(self, name):
+        return self.total[list(self.columns).index(name)] / max(self.epochs, 1)
+
+    def recent_mean(self, name):
+        return np.nanmean(self.recent[:, list(self.columns).index(name)])
+
+    def summary(self):
+        return ", ".join(f"{name} {self.mean(name):.2f} (last {len(self.recent)}: {self.recent_mean(name):.2f})"
+                         for name in self.columns)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Follow the logs of a running ASB benchmark.")
+    parser.add_argument("authdb")
+    parser.add_argument("keys")
+    parser.add_argument("--folder", default="osdi23")
+    parser.add_argument("--low-mem", action="store_true")
+    parser.add_argument("--stat", action="store_true", help="also follow the stat log")
+    parser.add_argument("--interval", type=float, default=5, help="seconds between polls")
+    parser.add_argument("--window", type=int, default=100, help="epochs in the recent-mean window")
+    parser.add_argument("--no-plot", action="store_true", help="print the aggregates only")
+    args = parser.parse_args()
+
+    tails = [(Tail(os.path.join(ASB_PATH, path(args.authdb, args.keys, args.folder, low_mem=args.low_mem))),
+              Aggregate(time_columns, args.window))]
+    if args.stat:
+        tails.append((Tail(os.path.join(ASB_PATH, path(args.authdb, args.keys, args.folder, stat=True))),
+                      Aggregate(stat_columns, args.window)))
+
+    lp = None
+    if not args.no_plot:
+        plt.ion()
+        fig = plt.figure(figsize=(8, 3))
+        ax = fig.add_subplot(111)
+        lp = LinePlot(decimate=True)
+        lp.add(np.empty(0), np.empty(0), label=args.authdb)
+
+    try:
+        while lp is None or plt.fignum_exists(fig.number):
+            for (tail, aggregate) in tails:
+                rows = tail.poll()
+                if len(rows) == 0:
+                    continue
+                aggregate.update(rows)
+                print(f"{os.path.basename(tail.path)} epoch {rows[-1, 0]:.0f}: {aggregate.summary()}")
+
+                if lp is not None and aggregate.columns is time_columns:
+                    lp.extend(0, rows[:, 0], rows[:, 2])
+                    ax.cla()
+                    lp.draw(ax)
+                    ax.set_title(f"Throughput of {args.authdb} on {args.keys}")
+                    ax.set_xlabel("Epoch")
+                    ax.set_ylabel("Operations per Second")
+                    ax.legend(loc=1)
+
+            if lp is None:
+                time.sleep(args.interval)
+            else:
+                plt.pause(args.interval)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+from collections import OrderedDict
+
+import data_parse
+import e2e
+
+
+def freeze(data):
+    # A LazyData also freezes the arrays it loads after this.
+    data.freeze()
+    return data
+
+
+class Loader:
+    """Memoizes data_parse.load and e2e.load for one process.
+
+    Loaded Data objects are shared between callers and their arrays are
+    read-only. At most `capacity` traces are kept, least recently used first
+    out. An only_time ASB entry is upgraded in place when the stat columns are
+    requested later, so the time log is not parsed twice. Requests that do
+    not name a folder read from `folder`.
+    """
+
+    def __init__(self, capacity=256, folder="osdi23"):
+        self.capacity = capacity
+        self.folder = folder
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.upgrades = 0
+
+    def lookup(self, key):
+        data = self.entries.get(key)
+        if data is not None:
+            self.entries.move_to_end(key)
+        return data
+
+    def insert(self, key, data):
+        self.entries[key] = freeze(data)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+        return data
+
+    def load_asb(self, authdb, keys, folder=None, low_mem=False, only_time=False, lazy=False, high_mem=0):
+        folder = folder or self.folder
+        key = ("asb", authdb, keys, folder, data_parse.variant(low_mem, high_mem))
+        data = self.lookup(key)
+        if data is None:
+            self.misses += 1
+            return self.insert(key, data_parse.load(authdb, keys, folder, low_mem=low_mem, only_time=only_time,
+                                                    lazy=lazy, high_mem=high_mem))
+
+        # A LazyData loads its stat log when a stat column is read.
+        if not only_time and not data.has_stat and not isinstance(data, data_parse.LazyData):
+            self.upgrades += 1
+            data.add_stat(data_parse.load_trace(authdb, keys, folder, stat=True))
+            return freeze(data)
+
+        self.hits += 1
+        return data
+
+    def load_asb_many(self, requests, folder=None, low_mem=False, only_time=False, workers=None, high_mem=0):
+        """Batch version of load_asb for (authdb, keys[, folder[, variant]]) requests.
+
+        Traces not in memory yet are parsed in parallel by data_parse.load_traces. Returns Data objects, or
+        data_parse.Missing markers, in input order.
+        """
+        requests = data_parse.requests_of(requests, folder or self.folder, low_mem, high_mem)
+
+        jobs, pending, loaded = [], {}, {}
+        for (authdb, size, f, v) in requests:
+            key = ("asb", authdb, size, f, v)
+            data = self.lookup(key)
+            if key in pending:
+                continue
+            if data is not None and (only_time or data.has_stat):
+                loaded[key] = data
+                continue
+            time_idx = stat_idx = None
+            if data is None:
+                time_idx = len(jobs)
+                jobs.append((authdb, size, f, False, *data_parse.memory(v).values()))
+            if not only_time:
+                stat_idx = len(jobs)
+                jobs.append((authdb, size, f, True))
+            pending[key] = (time_idx, stat_idx, data)
+        traces = data_parse.load_traces(jobs, workers)
+
+        for key, (time_idx, stat_idx, data) in pending.items():
+            time = traces[time_idx] if time_idx is not None else None
+            stat = traces[stat_idx] if stat_idx is not None else None
+            if data is None:
+                self.misses += 1
+            else:
+                self.upgrades += 1
+
+            if isinstance(time, data_parse.Missing) or isinstance(stat, data_parse.Missing):
+                loaded[key] = time if isinstance(time, data_parse.Missing) else stat
+            elif data is None:
+                loaded[key] = self.insert(key, data_parse.Data(time, stat, skip_start=(key[2]!="real")))
+            else:
+                data.add_stat(stat)
+                loaded[key] = freeze(data)
+
+        result = []
+        for req in requests:
+            key = ("asb", *req)
+            if key in pending:
+                del pending[key]
+            else:
+                self.hits += 1
+            result.append(loaded[key])
+        return result
+
+    def variants(self, authdb, keys, folder=None):
+        """Memory settings (authdb, keys) was run with in `folder`, for sweeping over them with load_asb_many."""
+        return data_parse.directory(folder or self.folder).variants(authdb, keys)
+
+    def load_e2e(self, ty, size, erc20=False, folder=None):
+        folder = folder or self.folder
+        key = ("e2e", ty, size, erc20, folder)
+        data = self.lookup(key)
+        if data is None:
+            self.misses += 1
+            return self.insert(key, e2e.load(ty, size, erc20=erc20, folder=folder))
+
+        self.hits += 1
+        return data
+
+    def load_e2e_many(self, requests, folder=None, workers=None):
+        """Batch version of load_e2e, loading the traces not in memory yet with e2e.load_many."""
+        requests = [(tuple(req) + (False, folder or self.folder)[len(req) - 2:])[:4] for req in requests]
+        keys = [("e2e", *req) for req in requests]
+
+        loaded = {key: self.lookup(key) for key in keys}
+        pending = [key for key in dict.fromkeys(keys) if loaded[key] is None]
+        for key, data in zip(pending, e2e.load_many([key[1:] for key in pending], workers=workers)):
+            loaded[key] = data if isinstance(data, data_parse.Missing) else self.insert(key, data)
+        self.misses += len(pending)
+        self.hits += len(keys) - len(pending)
+        return [loaded[key] for key in keys]
+
+    def clear(self):
+        self.entries.clear()
+
+    def report(self):
+        total = self.hits + self.misses + self.upgrades
+        return (f"loader: {total} requests, {self.hits} hits, {self.misses} misses, "
+                f"{self.upgrades} upgrades, {len(self.entries)} traces in memory")
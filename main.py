@@ -1,8 +1,26 @@
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 from matplotlib import pyplot as plt
-from data_parse import load as load_asb
-from data_parse import parse_number
-from e2e import load as load_e2e
+import catalog
+import data_parse
+import e2e
+import loader as loader_module
+import plot
+import records
+import stats
+import timing
+import warmup
+from data_parse import parse_number, present
+from loader import Loader
+from manifest import Manifest, source_hash, trace_state
+from path import ASB_PATH, ASB_E2E_PATH, DOWNCAST
 from plot import BarPlot
 from pathlib import Path
 import matplotlib
@@ -15,15 +33,49 @@ e2e_breakdown = ["raw", "lvmt", "lvmt64", "lvmt16", "rain", "mpt"]
 authdbs = ["lvmt", "lvmt64", "lvmt16", "rain", "mpt", "lvmt1"]
 authdbs_detail = authdbs[:-1]
 tasks = ["real", "fresh", "1m", "10m", "100m"]
-
-def maybe(func):
-    try:
-        ans = func()
-        if ans == np.nan:
-            return None
-        return ans
-    except:
-        return None
+all_size = ["1m", "1600k", "2500k", "4m", "6300k", "10m", "16m", "25m", "40m", "63m", "100m"]
+e2e_sizes = ["1m", "3m", "5m"]
+
+# The traces of each figure, listed once for its @figure declaration and its body, ordered so that the body
+# can cut them into rows.
+native_transfer_runs = [(authdb, size, False) for size in e2e_sizes for authdb in e2e_authdbs]
+erc20_transfer_runs = [(authdb, size, True) for size in e2e_sizes for authdb in e2e_authdbs]
+native_breakdown_runs = [(algo, "5m", False) for algo in e2e_breakdown]
+erc20_breakdown_runs = [(algo, "5m", True) for algo in e2e_breakdown]
+asb_tps_requests = [(authdb, size) for size in tasks for authdb in authdbs]
+asb_size_requests = [(algo, size) for algo in authdbs+["raw"] for size in all_size]
+asb_detail_requests = [(authdb, task) for task in tasks for authdb in authdbs_detail]
+asb_100m_requests = [(algo, "100m") for algo in authdbs_detail]
+
+loader = Loader()
+load_asb_many = loader.load_asb_many
+load_e2e_many = loader.load_e2e_many
+
+output_dir = "figures"
+figures = {}
+
+def figure(name, asb_time=(), asb=(), e2e=(), repeated=False):
+    """ Registers a plotting function under `name` with the traces it reads: (authdb, keys[, folder[, variant]])
+    requests loaded with only_time, the same loaded with stat, and (ty, size, erc20) e2e runs. A repeated
+    figure reads its (authdb, keys) requests from every repetition of the experiment folder. """
+    def register(func):
+        figures[name] = dict(func=func, asb_time=list(asb_time), asb=list(asb), e2e=list(e2e), repeated=repeated)
+        return func
+    return register
+
+def asb_requests(name, kind):
+    """ The figure's ASB requests of `kind` ("asb_time" or "asb"), expanded to every repetition if needed. """
+    entry = figures[name]
+    if not entry["repeated"]:
+        return entry[kind]
+    return [(*req[:2], f) for f in catalog.repeats(loader.folder) for req in entry[kind]]
+
+def rows(traces, width):
+    """ Cuts a figure's traces into consecutive rows of `width`. """
+    return [traces[i:i+width] for i in range(0, len(traces), width)]
+
+def output(name):
+    return f"{output_dir}/{name}.pdf"
 
 def labelize(authdbs):
     def f(authdb):
@@ -39,6 +91,7 @@ def labelize(authdbs):
         return [f(db) for db in authdbs]
 
 
+@figure("native_transfer", e2e=native_transfer_runs)
 def plot_native_transfer():
     """ Figure 2(a) """
 
@@ -46,8 +99,8 @@ def plot_native_transfer():
     ax = fig.add_subplot(111)
 
     bp = BarPlot()
-    for size in ["1m", "3m", "5m"]:
-        data = [load_e2e(authdb, size, erc20=False).mean_tps/1000 for authdb in e2e_authdbs]
+    for size, row in zip(e2e_sizes, rows(load_e2e_many(native_transfer_runs), len(e2e_authdbs))):
+        data = [data.mean_tps/1000 if present(data) else None for data in row]
         bp.add(size, *data)
     bp.draw(ax, space=0.3, labels=labelize(e2e_authdbs))
     bp.number(ax, align="c"*(len(e2e_authdbs)), hspace=0.5, format=lambda x: f"{x:0.0f}")
@@ -57,9 +110,10 @@ def plot_native_transfer():
     ax.set_xlabel("Number of Initialized Keys")
 
     # plt.show()
-    plt.savefig("figures/native_transfer.pdf", bbox_inches='tight')
+    plt.savefig(output("native_transfer"), bbox_inches='tight')
 
 
+@figure("erc20_transfer", e2e=erc20_transfer_runs)
 def plot_erc20_transfer():
     """ Figure 2(b) """
 
@@ -67,8 +121,8 @@ def plot_erc20_transfer():
     ax = fig.add_subplot(111)
     bp = BarPlot()
 
-    for size in ["1m", "3m", "5m"]:
-        data = [load_e2e(authdb, size, erc20=True).mean_tps/1000 for authdb in e2e_authdbs]
+    for size, row in zip(e2e_sizes, rows(load_e2e_many(erc20_transfer_runs), len(e2e_authdbs))):
+        data = [data.mean_tps/1000 if present(data) else None for data in row]
         bp.add(size, *data)
     bp.draw(ax, space=0.3, labels=labelize(e2e_authdbs))
     bp.number(ax, align="c"*(len(e2e_authdbs)), hspace=0.5, format=lambda x: f"{x:0.0f}")
@@ -78,9 +132,10 @@ def plot_erc20_transfer():
     ax.set_xlabel("Number of Initialized Keys")
 
     # plt.show()
-    plt.savefig("figures/erc20_transfer.pdf", bbox_inches='tight')
+    plt.savefig(output("erc20_transfer"), bbox_inches='tight')
 
 
+@figure("native_breakdown", e2e=native_breakdown_runs)
 def plot_native_breakdown():
     """ Figure 3(a) """
 
@@ -88,8 +143,9 @@ def plot_native_breakdown():
     ax = fig.add_subplot(111)
     bp = BarPlot()
 
-    for algo in e2e_breakdown:
-        data = load_e2e(algo, "5m", erc20=False)
+    for algo, data in zip(e2e_breakdown, load_e2e_many(native_breakdown_runs)):
+        if not present(data):
+            continue
         all = data.mean(8)/1e3/data.mean_tps
         auth = data.mean([2, 3, 4]).sum()/1e3/data.mean_tps
         backend = data.mean([5, 6, 7]).sum()/1e3/data.mean_tps
@@ -105,9 +161,10 @@ def plot_native_breakdown():
     ax.set_xlabel("Authenticated Storage Systems")
     ax.set_title(f"Time Usage Breakdown for Simple Transactions")
     ax.legend(loc=2)
-    plt.savefig("figures/native_breakdown.pdf", bbox_inches='tight')
+    plt.savefig(output("native_breakdown"), bbox_inches='tight')
 
 
+@figure("erc20_breakdown", e2e=erc20_breakdown_runs)
 def plot_erc20_breakdown():
     """ Figure 3(b) """
 
@@ -115,8 +172,9 @@ def plot_erc20_breakdown():
     ax = fig.add_subplot(111)
     bp = BarPlot()
 
-    for algo in e2e_breakdown:
-        data = load_e2e(algo, "5m", erc20=True)
+    for algo, data in zip(e2e_breakdown, load_e2e_many(erc20_breakdown_runs)):
+        if not present(data):
+            continue
         all = data.mean(8)/1e3/data.mean_tps
         auth = data.mean([2, 3, 4]).sum()/1e3/data.mean_tps
         backend = data.mean([5, 6, 7]).sum()/1e3/data.mean_tps
@@ -134,18 +192,24 @@ def plot_erc20_breakdown():
     ax.set_xlabel("Authenticated Storage Systems")
     ax.set_title(f"Time Usage Breakdown for ERC20 Transfers")
     ax.legend(loc=2)
-    plt.savefig("figures/erc20_breakdown.pdf", bbox_inches='tight')
+    plt.savefig(output("erc20_breakdown"), bbox_inches='tight')
 
 
+@figure("asb_tps", asb_time=asb_tps_requests, repeated=True)
 def plot_asb_tps():
     """ Figure 4(a) """
     fig = plt.figure(figsize=(8, 4))
     ax = fig.add_subplot(111)
     bp = BarPlot()
 
-    for size in ["real", "fresh", "1m", "10m", "100m"]:
-        data = [maybe(lambda: np.mean(load_asb(authdb, size, only_time=True).tps)/1000) for authdb in authdbs]
-        bp.add(size, *data)
+    # Mean over the repetitions of the experiment, with 95% bootstrap intervals when there are several.
+    runs = stats.across_runs(load_asb_many, asb_tps_requests,
+                             lambda data: np.mean(data.tps)/1000, catalog.repeats(loader.folder), only_time=True)
+    mean, low, high = stats.bootstrap(runs)
+    for (idx, size) in enumerate(tasks):
+        row = slice(idx*len(authdbs), (idx+1)*len(authdbs))
+        data = [None if np.isnan(x) else x for x in mean[row]]
+        bp.add(size, *data, errors=(low[row], high[row]))
 
     bp.draw(ax, space=0.2, labels=labelize(authdbs))
     bp.number(ax, align="cllllll", hspace=0.5, format=lambda x: f"{x:0.0f}")
@@ -153,24 +217,21 @@ def plot_asb_tps():
     ax.set_title("Throughput of Authenticated Storage Systems")
     ax.set_ylabel("Operations per second (1000x)")
     ax.set_xlabel("Workloads")
-    plt.savefig("figures/asb_tps.pdf", bbox_inches='tight')
+    plt.savefig(output("asb_tps"), bbox_inches='tight')
     
+@figure("asb_tps_on_size", asb_time=asb_size_requests)
 def plot_asb_tps_on_size():
     """ Figure 4(b) """
     fig = plt.figure(figsize=(7, 3.5), dpi=200)
     ax = fig.add_subplot(111)
 
-    all_size = ["1m", "1600k", "2500k", "4m", "6300k", "10m", "16m", "25m", "40m", "63m", "100m"]
     x = np.array([parse_number(x) for x in all_size])
 
     marker = "o^vsDphx"
-    for (idx, algo) in enumerate(authdbs+["raw"]):
-        def get_tps(size):
-            try:
-                return np.mean(load_asb(algo, size, only_time=True).tps)
-            except:
-                return 0
-        y = np.array([get_tps(size) for size in all_size])
+    algos = authdbs+["raw"]
+    traces = load_asb_many(asb_size_requests, only_time=True)
+    for (idx, (algo, row)) in enumerate(zip(algos, rows(traces, len(all_size)))):
+        y = np.array([np.mean(data.tps) if present(data) else 0 for data in row])
         ax.loglog(x[y>0], y[y>0], label=labelize(algo), marker=marker[idx])
 
     ax.minorticks_off()
@@ -185,8 +246,9 @@ def plot_asb_tps_on_size():
     ax.set_ylabel("Operations per Second (x1000)")
     ax.set_title("Throughput of Authenticated Storage Systems on Various Ledger Sizes")
     ax.set_ylim(1e3,5e5)
-    plt.savefig("figures/asb_tps_on_size.pdf", bbox_inches='tight')
+    plt.savefig(output("asb_tps_on_size"), bbox_inches='tight')
 
+@figure("asb_ra", asb_time=asb_detail_requests)
 def plot_ra():
     """ Figure 5(a) """
 
@@ -194,8 +256,8 @@ def plot_ra():
     ax = fig.add_subplot(111)
     bp = BarPlot()
 
-    for task in tasks:
-        data = [maybe(lambda: np.mean(load_asb(authdb, task, only_time=True).ra)) for authdb in authdbs_detail]
+    for task, traces in zip(tasks, rows(load_asb_many(asb_detail_requests, only_time=True), len(authdbs_detail))):
+        data = [np.mean(data.ra) if present(data) else None for data in traces]
         bp.add(task, *data)
 
     bp.draw(ax, space=0.12, labels=labelize(authdbs_detail))
@@ -204,9 +266,10 @@ def plot_ra():
     ax.set_title("Read Amplification of Authenticated Storage Systems")
     ax.set_xlabel("Workloads")
     ax.set_ylabel("Reads per Operation")
-    plt.savefig("figures/asb_ra.pdf", bbox_inches='tight')
+    plt.savefig(output("asb_ra"), bbox_inches='tight')
 
 
+@figure("asb_wa", asb_time=asb_detail_requests)
 def plot_wa():
     """ Figure 5(b) """
 
@@ -214,8 +277,8 @@ def plot_wa():
     ax = fig.add_subplot(111)
     bp = BarPlot()
 
-    for task in tasks:
-        data = [maybe(lambda: np.mean(load_asb(authdb, task, only_time=True).wa)) for authdb in authdbs_detail]
+    for task, traces in zip(tasks, rows(load_asb_many(asb_detail_requests, only_time=True), len(authdbs_detail))):
+        data = [np.mean(data.wa) if present(data) else None for data in traces]
         bp.add(task, *data)
 
     bp.draw(ax, space=0.2, labels=labelize(authdbs_detail))
@@ -224,9 +287,10 @@ def plot_wa():
     ax.set_title("Write Amplification of Authenticated Storage Systems")
     ax.set_xlabel("Workloads")
     ax.set_ylabel("Writes per Operation")
-    plt.savefig("figures/asb_wa.pdf", bbox_inches='tight')
+    plt.savefig(output("asb_wa"), bbox_inches='tight')
 
 
+@figure("asb_rs", asb=asb_detail_requests)
 def plot_rs():
     """ Figure 7(a) """
 
@@ -238,9 +302,8 @@ def plot_rs():
         length = min(len(x.rs), len(x.rempty))
         return x.rs[:length] * (1 - x.rempty[:length]/(x.rn[:length] + x.rempty[:length]))
 
-    for task in tasks:
-        data = [np.mean(read_size(load_asb(authdb, task)))
-                for authdb in authdbs_detail]
+    for task, traces in zip(tasks, rows(load_asb_many(asb_detail_requests), len(authdbs_detail))):
+        data = [np.mean(read_size(data)) if present(data) else None for data in traces]
         bp.add(task, *data)
 
     bp.draw(ax, space=0.2, labels=labelize(authdbs_detail))
@@ -249,9 +312,10 @@ def plot_rs():
     ax.set_title("Data Size per Read Operation on Backend")
     ax.set_xlabel("Workloads")
     ax.set_ylabel("Data Size (bytes)")
-    plt.savefig("figures/asb_rs.pdf", bbox_inches='tight')
+    plt.savefig(output("asb_rs"), bbox_inches='tight')
 
 
+@figure("asb_ws", asb=asb_detail_requests)
 def plot_ws():
     """ Figure 7(b) """
 
@@ -261,9 +325,8 @@ def plot_ws():
 
     def write_size(x): return x.ws
 
-    for task in tasks:
-        data = [np.mean(write_size(load_asb(authdb, task)))
-                for authdb in authdbs_detail]
+    for task, traces in zip(tasks, rows(load_asb_many(asb_detail_requests), len(authdbs_detail))):
+        data = [np.mean(write_size(data)) if present(data) else None for data in traces]
         bp.add(task, *data)
 
     bp.draw(ax, space=0.2, labels=labelize(authdbs_detail))
@@ -272,8 +335,9 @@ def plot_ws():
     ax.set_title("Data Size per Write Operation on Backend")
     ax.set_xlabel("Workloads")
     ax.set_ylabel("Data Size (bytes)")
-    plt.savefig("figures/asb_ws.pdf", bbox_inches='tight')
+    plt.savefig(output("asb_ws"), bbox_inches='tight')
     
+@figure("asb_rc", asb=asb_100m_requests)
 def plot_rc():
     """ Figure 7(c) """
 
@@ -282,8 +346,10 @@ def plot_rc():
 
     x = np.arange(10,100,10)
     marker = "o^vsDphx"
-    for (idx, algo) in enumerate(authdbs_detail):
-        y = load_asb(algo, "100m").rc.mean(axis=1)[:9]
+    for (idx, (algo, data)) in enumerate(zip(authdbs_detail, load_asb_many(asb_100m_requests))):
+        if not present(data):
+            continue
+        y = data.rc.mean(axis=1)[:9]
         ax.semilogy(x[y>0], y[y>0], label=labelize(algo), marker=marker[idx])
 
     ax.minorticks_off()
@@ -297,9 +363,10 @@ def plot_rc():
     ax.set_ylabel("Data Size (Bytes)")
     ax.set_title("Backend Read Operations: Data Size Distribution")
     ax.set_ylim(30,700)
-    plt.savefig("figures/asb_rc.pdf", bbox_inches='tight')
+    plt.savefig(output("asb_rc"), bbox_inches='tight')
 
     
+@figure("asb_wc", asb=asb_100m_requests)
 def plot_wc():
     """ Figure 7(d) """
 
@@ -308,8 +375,10 @@ def plot_wc():
 
     x = np.arange(10,100,10)
     marker = "o^vsDphx"
-    for (idx, algo) in enumerate(authdbs_detail):
-        y = load_asb(algo, "100m").wc.mean(axis=1)[:9]
+    for (idx, (algo, data)) in enumerate(zip(authdbs_detail, load_asb_many(asb_100m_requests))):
+        if not present(data):
+            continue
+        y = data.wc.mean(axis=1)[:9]
         y[y==0] = np.full((9,),30)[y==0]
         ax.semilogy(x, y, label=labelize(algo), marker=marker[idx])
 
@@ -324,22 +393,120 @@ def plot_wc():
     ax.set_ylabel("Data Size (Bytes)")
     ax.set_title("Backend Write Operations: Data Size Distribution")
     ax.set_ylim(30,700)
-    plt.savefig("figures/asb_wc.pdf", bbox_inches='tight')
+    plt.savefig(output("asb_wc"), bbox_inches='tight')
+
 
 
+def prefetch(names, workers=None):
+    """ Loads every trace the selected figures read, once and in parallel. Returns the loader results,
+    including the markers of missing and corrupt traces. """
+    asb = {req for name in names for req in asb_requests(name, "asb")}
+    asb_time = {req for name in names for req in asb_requests(name, "asb_time")} - asb
+    e2e = {req for name in names for req in figures[name]["e2e"]}
+    with timing.span("prefetch", ""):
+        return (loader.load_asb_many(sorted(asb), workers=workers)
+                + loader.load_asb_many(sorted(asb_time), only_time=True, workers=workers)
+                + loader.load_e2e_many(sorted(e2e), workers=workers))
+
+
+def render(name):
+    start = time.perf_counter()
+    try:
+        with timing.span("figure", name):
+            figures[name]["func"]()
+    except Exception as e:
+        return name, None, f"{type(e).__name__}: {e}"
+    finally:
+        plt.close("all")
+    return name, time.perf_counter() - start, None
+
+
+def inputs(name):
+    """ Size and mtime of every log the figure reads. """
+    entry = figures[name]
+    asb = data_parse.requests_of(asb_requests(name, "asb"), loader.folder)
+    asb_time = data_parse.requests_of(asb_requests(name, "asb_time"), loader.folder) + asb
+    paths = [data_parse.path(authdb, keys, f, **data_parse.memory(v)) for (authdb, keys, f, v) in asb_time]
+    paths += [data_parse.path(authdb, keys, f, stat=True) for (authdb, keys, f, v) in asb]
+    state = {}
+    for p in paths:
+        state.update(trace_state(os.path.join(ASB_PATH, p)))
+    for (ty, size, erc20) in entry["e2e"]:
+        state.update(trace_state(os.path.join(ASB_E2E_PATH, e2e.path(ty, size, erc20, loader.folder))))
+    return state
+
+
+def fingerprint(name):
+    """ Identifies the code and parameters a figure is built with. """
+    entry = figures[name]
+    code = source_hash(entry["func"], labelize, plot, data_parse, e2e, stats, warmup, records, loader_module, catalog)
+    params = json.dumps([asb_requests(name, "asb_time"), asb_requests(name, "asb"), entry["e2e"], loader.folder,
+                         DOWNCAST])
+    return hashlib.sha1((code + params).encode()).hexdigest()
+
+
+def run(names, workers=None, force=False):
+    if workers is None:
+        workers = os.cpu_count() or 1
+    manifest = Manifest(os.path.join(output_dir, ".manifest.json"))
+    state = {name: (fingerprint(name), inputs(name)) for name in names}
+    if not force:
+        names = [name for name in names if manifest.stale(name, *state[name], output(name))]
+    if not names:
+        print("all figures are up to date")
+        return []
+
+    for line in catalog.report(prefetch(names, workers)):
+        print(line)
+    print(loader.report())
+
+    if workers <= 1 or len(names) <= 1:
+        results = [render(name) for name in names]
+    else:
+        # Forked workers share the traces loaded above instead of loading them again.
+        context = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() else None
+        with ProcessPoolExecutor(min(workers, len(names)), mp_context=context) as pool:
+            results = list(pool.map(render, names))
+    failed = []
+    for (name, elapsed, error) in results:
+        if error is not None:
+            failed.append(name)
+            print(f"{name}: failed, {error}")
+            continue
+        manifest.record(name, *state[name])
+        print(f"{name}: {elapsed:.2f} s")
+    manifest.save()
+    return failed
+
 
 if __name__ == "__main__":
-    Path("figures").mkdir(exist_ok=True)
-
-    plot_native_transfer()
-    plot_erc20_transfer()
-    plot_native_breakdown()
-    plot_erc20_breakdown()
-    plot_asb_tps()
-    plot_asb_tps_on_size()
-    plot_ra()
-    plot_wa()
-    plot_rs()
-    plot_ws()
-    plot_rc()
-    plot_wc()
+    parser = argparse.ArgumentParser(description="Plot the figures of the paper.")
+    parser.add_argument("--only", help="comma-separated figures to plot (default: all)")
+    parser.add_argument("--list", action="store_true", help="list the figure names and exit")
+    parser.add_argument("--workers", type=int, default=None, help="processes for loading and rendering (default: all cores)")
+    parser.add_argument("--folder", default="osdi23", help="experiment folder to read the traces from")
+    parser.add_argument("--output", default="figures", help="directory to write the figures to")
+    parser.add_argument("--force", action="store_true", help="rebuild figures whose inputs and code are unchanged")
+    parser.add_argument("--profile", action="store_true",
+                        help="time every load, parse, draw and savefig and print a report at exit (or set ASB_PROFILE=1)")
+    parser.add_argument("--profile-trace", default=None, help="with --profile, also write a Chrome trace to this file")
+    args = parser.parse_args()
+
+    if args.list:
+        print("\n".join(figures))
+        raise SystemExit
+
+    names = list(figures) if args.only is None else args.only.split(",")
+    unknown = [name for name in names if name not in figures]
+    if unknown:
+        parser.error(f"unknown figures: {', '.join(unknown)}")
+
+    matplotlib.use("Agg")
+    if args.profile or args.profile_trace or os.environ.get("ASB_PROFILE"):
+        timing.start(args.profile_trace)
+        plt.savefig = timing.timed("savefig")(plt.savefig)
+    loader.folder = args.folder
+    output_dir = args.output
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    if run(names, args.workers, args.force):
+        raise SystemExit(1)
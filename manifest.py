@@ -0,0 +1,57 @@
+import hashlib
+import inspect
+import json
+import os
+
+import compressed
+
+
+def file_state(path):
+    try:
+        st = os.stat(path)
+        return [st.st_size, st.st_mtime_ns]
+    except FileNotFoundError:
+        return None
+
+
+def trace_state(path):
+    """State of a log, of its compressed copies and of the binary traces convert.py may have written next to it."""
+    base = os.path.splitext(path)[0]
+    paths = [path, *(path + suffix for suffix in compressed.suffixes), base + ".npy", base + ".npz"]
+    return {p: file_state(p) for p in paths}
+
+
+def source_hash(*objects):
+    digest = hashlib.sha1()
+    for obj in objects:
+        digest.update(inspect.getsource(obj).encode())
+    return digest.hexdigest()
+
+
+class Manifest:
+    """Records what each figure was last built from, so unchanged figures can be skipped like make does.
+
+    A figure is identified by a fingerprint of its code and parameters, plus the size and mtime of every
+    input log. It is stale when either differs from the last build or its output file is missing.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.entries = json.load(f)
+
+    def stale(self, name, code, inputs, output):
+        entry = self.entries.get(name)
+        return (entry is None or not os.path.exists(output)
+                or entry["code"] != code or entry["inputs"] != inputs)
+
+    def record(self, name, code, inputs):
+        self.entries[name] = dict(code=code, inputs=inputs)
+
+    def save(self):
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.entries, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.path)
@@ -1,2 +1,16 @@
 ASB_PATH = "../amt-db"
-ASB_E2E_PATH = "../conflux-rust-amt"
\ No newline at end of file
+ASB_E2E_PATH = "../conflux-rust-amt"
+
+# Parsed traces are cached here between runs. Set to None to disable the cache.
+CACHE_PATH = "cache"
+
+# Per-trace aggregates of all experiment folders, see summary.py.
+SUMMARY_PATH = "summary.db"
+
+
+# Threads for decompressing .gz/.xz/.zst logs with pigz/xz/zstd, if installed. 0 decompresses in-process.
+DECOMPRESS_THREADS = 0
+
+# How loaded traces are stored, see records.py: None keeps float64, "int" stores integral columns as the
+# smallest integer type that holds them (exact), "float32" also rounds the other measurements to float32.
+DOWNCAST = None
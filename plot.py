@@ -1,5 +1,7 @@
 import numpy as np
 
+import timing
+
 def list_ceil(value, ticks):
     return next(filter(lambda x: x>value, ticks), None)
 
@@ -16,19 +18,56 @@ def ceilY(y):
     ymax = np.ceil(y*1.1/ytick)*ytick
     return ymax,ytick
 
-remove_none = np.vectorize(lambda x: 0 if x is None or x == np.nan else x)
+def as_float(values):
+    """ values as a float array, None becoming NaN. """
+    return np.array([np.nan if x is None else x for x in values], dtype=float)
+
+def decimate(X,Y,buckets):
+    """ Splits the X range into `buckets` equal slices and keeps the first, last, lowest and highest point of
+    each. A line through the kept points covers the same pixels as the full line when every slice is at most
+    a pixel wide. X must be sorted. """
+    X = np.asarray(X)
+    Y = np.asarray(Y)
+    if len(X) <= 4*buckets:
+        return X,Y
+    span = X[-1] - X[0]
+    if not span > 0:
+        return X,Y
+    bucket = np.minimum(((X - X[0]) / span * buckets).astype(np.int64), buckets - 1)
+    starts = np.flatnonzero(np.diff(bucket, prepend=-1))
+    ends = np.append(starts[1:], len(X)) - 1
+    # Within each slice, order the points by Y; the slice's lowest and highest points end up at its bounds.
+    order = np.lexsort((Y, bucket))
+    keep = np.unique(np.concatenate([starts, ends, order[starts], order[ends]]))
+    return X[keep],Y[keep]
 
 class LinePlot:
-    def __init__(self):
+    """ With decimate=True, draw reduces each line to a few points per pixel column of the axes (see
+    decimate), which keeps long time series fast to render and small in vector output. """
+
+    def __init__(self,decimate=False):
         self.data = []
         self.maxY = 0
+        self.decimate = decimate
     
     def add(self,X,Y,**kwargs):
         self.data.append((X,Y,kwargs))
-        self.maxY = max(self.maxY,max(Y))
+        if len(Y) > 0:
+            self.maxY = max(self.maxY,max(Y))
+
+    def extend(self,idx,X,Y):
+        """ Appends points to the idx-th line, for plots that are redrawn while the data grows. """
+        X0,Y0,kwargs = self.data[idx]
+        self.data[idx] = (np.concatenate([X0,X]),np.concatenate([Y0,Y]),kwargs)
+        if len(Y) > 0:
+            self.maxY = max(self.maxY,max(Y))
         
+    @timing.timed("LinePlot.draw")
     def draw(self,ax):
+        buckets = int(ax.get_window_extent().width)
         for (X,Y,kwargs) in self.data:
+            if self.decimate:
+                X,Y = decimate(X,Y,buckets)
             ax.plot(X,Y,**kwargs)
         ymax, ytick = ceilY(self.maxY)
         ax.set_ylim((0,ymax))
@@ -39,17 +78,29 @@ class BarPlot:
         self.cols = None
         self.data = []
         self.label = []
+        self.errors = []
         self.maxY = 0
         
-    def add(self,label,*args):
+    def add(self,label,*args,errors=None):
+        """ errors optionally gives (low, high) sequences, the interval drawn as an error bar on each bar;
+        NaN or None leaves a bar without one. """
         if self.cols is None:
             self.cols = len(args)
         else:
             assert self.cols == len(args)
         self.data.append(np.array(args))
         self.label.append(label)
-        self.maxY = max(self.maxY,max(remove_none(args)))
+        values = as_float(args)
+        if not np.all(np.isnan(values)):
+            self.maxY = max(self.maxY,np.nanmax(values))
+        if errors is not None:
+            low, high = [as_float(e) for e in errors]
+            if not np.all(np.isnan(high)):
+                self.maxY = max(self.maxY,np.nanmax(high))
+            errors = (low, high)
+        self.errors.append(errors)
         
+    @timing.timed("BarPlot.draw")
     def draw(self,ax,labels=None,space=0.3):
         if labels is None:
             if self.cols == 1:
@@ -62,9 +113,14 @@ class BarPlot:
         w = width/self.cols
         length = len(self.data)
         base = [(2*x+1)*w/2-width/2 for x in range(self.cols)]
+        yerr = self.yerr()
         for idx, v in enumerate(np.array(self.data).T):
-            v = remove_none(v)
-            ax.bar(np.arange(length)+base[idx], v, width = w,label=labels[idx])
+            v = as_float(v)
+            if yerr is None:
+                ax.bar(np.arange(length)+base[idx], v, width = w,label=labels[idx])
+            else:
+                ax.bar(np.arange(length)+base[idx], v, width = w,label=labels[idx],
+                       yerr=yerr[:,:,idx], capsize=2, error_kw=dict(elinewidth=0.8))
             
         ax.set_xticks(np.arange(length))
         ax.set_xticklabels(self.label)
@@ -74,6 +130,18 @@ class BarPlot:
         ax.set_ylim((0,ymax))
         ax.set_yticks(np.arange(0,ymax+ytick,ytick))
         
+    def yerr(self):
+        """ Distances from each bar to the ends of its interval, as a (2, clusters, cols) array, or None if
+        no bar has an interval. """
+        if all(e is None or np.all(np.isnan(e[1])) for e in self.errors):
+            return None
+        yerr = np.full((2, len(self.data), self.cols), np.nan)
+        for i, (v, e) in enumerate(zip(self.data, self.errors)):
+            if e is not None:
+                v = as_float(v)
+                yerr[0, i], yerr[1, i] = v - e[0], e[1] - v
+        return yerr
+
     def number(self,ax,align = None, format=None,**kwargs):
         if format is None:
             format = str
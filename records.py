@@ -0,0 +1,49 @@
+import numpy as np
+
+# Loaded traces are kept as one structured array each, with a named field per column (or a subarray field for
+# a group of columns such as the percentiles), holding only the rows and columns Data reads.
+
+downcasts = (None, "int", "float32")
+# Downcast fields are read back as float64 (see column), the integer types only save memory.
+integers = (np.int16, np.int32, np.int64)
+
+
+def field_type(values, downcast=None, exact=False):
+    """The dtype to store `values` in. With downcast, integral values get the smallest integer type that holds
+    them, and with "float32" the others are rounded to float32 unless `exact` (timestamps) is set."""
+    if downcast not in downcasts:
+        raise ValueError(f"unknown downcast {downcast!r}, expected one of {downcasts}")
+    if downcast is None or len(values) == 0:
+        return values.dtype
+    if np.isfinite(values).all() and (values == np.trunc(values)).all():
+        low, high = values.min(), values.max()
+        for ty in integers:
+            info = np.iinfo(ty)
+            if info.min <= low and high <= info.max:
+                return np.dtype(ty)
+    if downcast == "float32" and not exact:
+        return np.dtype(np.float32)
+    return values.dtype
+
+
+def pack(columns, downcast=None, exact=()):
+    """One structured array from `columns`, a list of (name, values) where values has one entry per row, or
+    a row of entries for a subarray field. Fields named in `exact` are never rounded."""
+    fields = []
+    for name, values in columns:
+        ty = field_type(values, downcast, exact=name in exact)
+        fields.append((name, ty, values.shape[1:]))
+    # Widest fields first, so aligned fields need no padding.
+    fields.sort(key=lambda f: -f[1].itemsize)
+    dtype = np.dtype([(name, ty, shape) for (name, ty, shape) in fields], align=True)
+    result = np.empty(len(columns[0][1]), dtype=dtype)
+    for name, values in columns:
+        result[name] = values
+    return result
+
+
+def column(array, name):
+    """Field `name` of a packed array as float64: a view when it is stored as float64, otherwise a copy, so
+    arithmetic on downcast fields neither overflows nor rounds to float32."""
+    values = array[name]
+    return values if values.dtype == np.float64 else values.astype(np.float64)
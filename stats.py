@@ -0,0 +1,46 @@
+import numpy as np
+
+from data_parse import present
+
+
+def across_runs(load_many, requests, metric, folders, **kwargs):
+    """metric(data) of each request in every folder of `folders` that has the trace.
+
+    All repetitions are loaded in one load_many call (for instance Loader.load_asb_many, with kwargs such as
+    only_time passed through). Returns one array of per-run values per request.
+    """
+    batch = [(*req, folder) for folder in folders for req in requests]
+    values = [[] for _ in requests]
+    for idx, data in enumerate(load_many(batch, **kwargs)):
+        if present(data):
+            values[idx % len(requests)].append(metric(data))
+    return [np.array(v, dtype=float) for v in values]
+
+
+def bootstrap(samples, resamples=2000, confidence=0.95, seed=0):
+    """Mean and percentile bootstrap confidence interval of the mean of every array in `samples`.
+
+    The arrays are padded into one matrix and all resamples of all arrays are drawn as a single
+    (arrays, resamples, length) index array, so the work is a few NumPy calls however many arrays and
+    resamples there are. Meant for a few values per array, such as one per run. Returns (mean, low, high);
+    low and high are NaN for arrays with fewer than two values, mean is NaN for empty ones.
+    """
+    n = np.array([len(s) for s in samples], dtype=np.int64)
+    width = max(n.max(initial=0), 1)
+    padded = np.zeros((len(samples), width))
+    for idx, s in enumerate(samples):
+        padded[idx, :len(s)] = s
+
+    rng = np.random.default_rng(seed)
+    picks = (rng.random((len(samples), resamples, width)) * n[:, None, None]).astype(np.int64)
+    draws = padded[np.arange(len(samples))[:, None, None], picks]
+    # Only the first n draws of a row are a resample of it, the rest index the padding.
+    draws = np.where(np.arange(width) < n[:, None, None], draws, 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        means = draws.sum(axis=2) / n[:, None]
+        mean = padded.sum(axis=1) / n
+    tail = (1 - confidence) / 2 * 100
+    low, high = np.percentile(means, [tail, 100 - tail], axis=1)
+    low[n < 2] = np.nan
+    high[n < 2] = np.nan
+    return mean, low, high
@@ -0,0 +1,175 @@
+import argparse
+import json
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+
+import cache
+import data_parse
+import e2e
+from catalog import Catalog, report
+from data_parse import Corrupt, Missing
+from manifest import trace_state
+from path import SUMMARY_PATH
+
+metrics = ["tps", "ra", "wa"]
+
+schema = f"""
+CREATE TABLE IF NOT EXISTS asb (
+    folder TEXT, authdb TEXT, keys TEXT, variant TEXT, source TEXT,
+    first_epoch REAL, epochs INTEGER,
+    {", ".join(f"mean_{m} REAL, median_{m} REAL, p99_{m} REAL" for m in metrics)},
+    PRIMARY KEY (folder, authdb, keys, variant)
+);
+CREATE TABLE IF NOT EXISTS e2e (
+    folder TEXT, ty TEXT, size TEXT, erc20 INTEGER, source TEXT,
+    start REAL, duration REAL, mean_tps REAL, median_tps REAL, p99_tps REAL,
+    PRIMARY KEY (folder, ty, size, erc20)
+);
+"""
+
+
+def aggregate(values):
+    return [float(np.nanmean(values)), float(np.nanmedian(values)), float(np.nanpercentile(values, 99))]
+
+
+def summarize_asb(log, keys):
+    data = data_parse.Data(cache.load(log, data_parse.log_parser(), tag=data_parse.tag), skip_start=(keys!="real"))
+    if len(data.epoch) == 0:
+        raise ValueError("no epochs")
+    row = [float(data.epoch[0]), len(data.epoch)]
+    for m in metrics:
+        row += aggregate(getattr(data, m))
+    return row
+
+
+def summarize_e2e(log):
+    data = e2e.Data(cache.load(log, e2e.parse_file, tag=e2e.tag()))
+    if data.samples is None:
+        raise ValueError("no metrics")
+    return [float(data.start), float(data.timestamp[-1]), float(data.mean_tps)] + aggregate(data.tps)[1:]
+
+
+def try_summarize(summarize, log, *args):
+    """summarize(log, *args), or a Missing/Corrupt marker for a trace that cannot be summarized, such as a run
+    that has only written its first lines."""
+    try:
+        return summarize(log, *args)
+    except FileNotFoundError as e:
+        return Missing(e.filename)
+    except Exception as e:
+        return Corrupt(log, f"{type(e).__name__}: {e}")
+
+
+class Index:
+    """Per-trace aggregates of every experiment folder, kept in SQLite.
+
+    update() summarizes the traces that are new or whose logs changed since the last update and drops the
+    ones whose logs are gone; queries never touch the raw logs. Traces that fail to summarize get no row, so
+    the next update tries them again.
+    """
+
+    def __init__(self, path=SUMMARY_PATH):
+        self.db = sqlite3.connect(path)
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(schema)
+
+    def update(self, workers=None):
+        """Returns the number of ASB traces and e2e runs summarized, and the markers of those that failed."""
+        catalog = Catalog()
+        asb = {(folder, authdb, keys, variant): catalog.asb_log(authdb, keys, folder, variant)
+               for (authdb, keys, folder, variant) in catalog.asb}
+        runs = {(folder, ty, size, erc20): catalog.e2e_log(ty, size, erc20, folder)
+                for (ty, size, erc20, folder) in catalog.e2e}
+
+        asb_jobs = self.stale("asb", "folder, authdb, keys, variant", asb)
+        e2e_jobs = self.stale("e2e", "folder, ty, size, erc20", runs)
+        failed, counts = [], []
+        with ProcessPoolExecutor(workers) as pool:
+            asb_rows = pool.map(partial(try_summarize, summarize_asb), [asb[key] for key in asb_jobs],
+                                [key[2] for key in asb_jobs])
+            e2e_rows = pool.map(partial(try_summarize, summarize_e2e), [runs[key] for key in e2e_jobs])
+            for table, columns, logs, jobs, rows in (("asb", "folder, authdb, keys, variant", asb, asb_jobs, asb_rows),
+                                                     ("e2e", "folder, ty, size, erc20", runs, e2e_jobs, e2e_rows)):
+                count = 0
+                for (key, row) in zip(jobs, rows):
+                    if isinstance(row, Missing):
+                        # No row and no source state for a trace that failed, so the next update retries it.
+                        failed.append(row)
+                        self.delete(table, columns, key)
+                        continue
+                    self.db.execute(f"INSERT OR REPLACE INTO {table} VALUES ({', '.join('?' * (5 + len(row)))})",
+                                    (*key, json.dumps(trace_state(logs[key])), *row))
+                    count += 1
+                counts.append(count)
+        self.db.commit()
+        return (*counts, failed)
+
+    def delete(self, table, columns, key):
+        where = " AND ".join(f"{c.strip()} = ?" for c in columns.split(","))
+        self.db.execute(f"DELETE FROM {table} WHERE {where}", key)
+
+    def stale(self, table, columns, found):
+        """Returns the keys in `found` whose logs changed, and deletes rows whose logs are gone."""
+        stored = {tuple(row)[:-1]: row[-1] for row in self.db.execute(f"SELECT {columns}, source FROM {table}")}
+        for key in stored.keys() - found.keys():
+            self.delete(table, columns, key)
+        return [key for key, log in found.items() if stored.get(key) != json.dumps(trace_state(log))]
+
+    def query(self, sql, *params):
+        return [dict(row) for row in self.db.execute(sql, params)]
+
+    def asb(self, folder=None, authdb=None, keys=None, variant=""):
+        """Rows of the asb table; arguments left as None match every value."""
+        filters = dict(folder=folder, authdb=authdb, keys=keys, variant=variant)
+        filters = {k: v for k, v in filters.items() if v is not None}
+        where = " AND ".join(f"{k} = ?" for k in filters) or "1"
+        return self.query(f"SELECT * FROM asb WHERE {where} ORDER BY folder, authdb, keys", *filters.values())
+
+    def e2e(self, folder=None, ty=None, size=None, erc20=None):
+        filters = dict(folder=folder, ty=ty, size=size, erc20=erc20)
+        filters = {k: v for k, v in filters.items() if v is not None}
+        where = " AND ".join(f"{k} = ?" for k in filters) or "1"
+        return self.query(f"SELECT * FROM e2e WHERE {where} ORDER BY folder, ty, size", *filters.values())
+
+    def on_size(self, metric="mean_tps", folder="osdi23", variant=""):
+        """{authdb: [(keys, value), ...]} sorted by ledger size, e.g. TPS against ledger size for every authdb."""
+        result = {}
+        for row in self.asb(folder=folder, variant=variant):
+            if row["keys"] in ("real", "fresh"):
+                continue
+            result.setdefault(row["authdb"], []).append((row["keys"], row[metric]))
+        for points in result.values():
+            points.sort(key=lambda point: data_parse.parse_number(point[0]))
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain and query the summary index of all experiment folders.")
+    parser.add_argument("command", choices=["update", "asb", "e2e"])
+    parser.add_argument("--folder", default=None)
+    parser.add_argument("--variant", default="", help="memory setting of ASB traces: '', lowmem or highmem<N>")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    index = Index()
+    if args.command == "update":
+        asb_count, e2e_count, failed = index.update(args.workers)
+        print(f"summarized {asb_count} ASB traces and {e2e_count} e2e runs")
+        for line in report(failed):
+            print(line)
+    elif args.command == "asb":
+        for row in index.asb(folder=args.folder, variant=args.variant):
+            print(f"{row['folder']:>10} {row['authdb']:>8} {row['keys']:>6} {row['variant']:>9} "
+                  + " ".join(f"{m} {row['mean_' + m]:.2f}/{row['median_' + m]:.2f}/{row['p99_' + m]:.2f}" for m in metrics))
+    else:
+        for row in index.e2e(folder=args.folder):
+            task = "erc20" if row["erc20"] else "native"
+            print(f"{row['folder']:>10} {row['ty']:>8} {row['size']:>4} {task:>6} "
+                  f"tps {row['mean_tps']:.0f}/{row['median_tps']:.0f}/{row['p99_tps']:.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import atexit
+import json
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+# Set by start(), or by ASB_PROFILE_DIR in processes started from a profiled run.
+directory = os.environ.get("ASB_PROFILE_DIR")
+enabled = directory is not None
+stack = []
+sink = None
+
+
+def start(trace=None):
+    """Records spans from now on, in this process and in the processes it starts. At exit, prints a report
+    and, if `trace` is given, writes the spans there as a Chrome trace (chrome://tracing, Perfetto)."""
+    global directory, enabled
+    directory = tempfile.mkdtemp(prefix="asb-profile-")
+    os.environ["ASB_PROFILE_DIR"] = directory
+    enabled = True
+    atexit.register(finish, trace)
+
+
+def record(event):
+    # Workers exit without running atexit handlers, so every process appends its events to its own file as
+    # they happen. A forked child gets its own file, not the parent's handle.
+    global sink
+    if sink is None or sink[0] != os.getpid():
+        sink = (os.getpid(), open(os.path.join(directory, f"{os.getpid()}.jsonl"), "a", buffering=1))
+    sink[1].write(json.dumps(event) + "\n")
+
+
+@contextmanager
+def span(stage, item=None, **args):
+    """Times the block as one `stage` of `item` (default: the item of the enclosing span). Yields a dict the
+    block can add counters to, such as lines, which the report turns into a rate."""
+    if not enabled:
+        yield args
+        return
+    if item is None:
+        item = stack[-1] if stack else ""
+    stack.append(item)
+    start = time.perf_counter()
+    try:
+        yield args
+    finally:
+        end = time.perf_counter()
+        stack.pop()
+        record(dict(stage=stage, item=item, pid=os.getpid(), start=start, duration=end - start, args=args))
+
+
+def timed(stage):
+    """Decorator recording every call of the function as a span."""
+    def decorate(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class Lines:
+    """Iterates over a file's lines and counts them."""
+
+    def __init__(self, file):
+        self.file = file
+        self.count = 0
+
+    def __iter__(self):
+        for line in self.file:
+            self.count += 1
+            yield line
+
+
+def events():
+    result = []
+    for name in sorted(os.listdir(directory)):
+        with open(os.path.join(directory, name)) as f:
+            result += [json.loads(line) for line in f]
+    return result
+
+
+def report(events):
+    stages = {}
+    for e in events:
+        s = stages.setdefault(e["stage"], dict(count=0, total=0.0, max=0.0, lines=0))
+        s["count"] += 1
+        s["total"] += e["duration"]
+        s["max"] = max(s["max"], e["duration"])
+        s["lines"] += e["args"].get("lines", 0)
+
+    lines = [f"{'stage':<16} {'count':>6} {'total s':>9} {'mean ms':>9} {'max ms':>9} {'lines/s':>12}"]
+    for stage, s in sorted(stages.items(), key=lambda kv: -kv[1]["total"]):
+        rate = f"{s['lines'] / s['total']:,.0f}" if s["lines"] and s["total"] > 0 else ""
+        lines.append(f"{stage:<16} {s['count']:>6} {s['total']:>9.3f} {s['total'] / s['count'] * 1e3:>9.2f} "
+                     f"{s['max'] * 1e3:>9.2f} {rate:>12}")
+
+    lines.append("")
+    lines.append("slowest:")
+    for e in sorted(events, key=lambda e: -e["duration"])[:20]:
+        lines.append(f"{e['duration'] * 1e3:>9.2f} ms  {e['stage']:<16} {os.path.basename(e['item'])}")
+    return "\n".join(lines)
+
+
+def chrome_trace(events):
+    return dict(traceEvents=[dict(name=e["stage"], cat="asb", ph="X", pid=e["pid"], tid=e["pid"],
+                                  ts=e["start"] * 1e6, dur=e["duration"] * 1e6, args=dict(item=e["item"], **e["args"]))
+                             for e in events])
+
+
+def finish(trace=None):
+    recorded = events()
+    shutil.rmtree(directory, ignore_errors=True)
+    print(report(recorded))
+    if trace is not None:
+        with open(trace, "w") as f:
+            json.dump(chrome_trace(recorded), f)
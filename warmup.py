@@ -0,0 +1,98 @@
+import numpy as np
+
+# Warm-up detection for traces with one row per sample, as the parsers return them. Every strategy returns the
+# index of the first steady-state row, so trimming is a slice and the trimmed trace a view of the loaded one.
+# The columns the strategies search (epochs, timestamps) must be non-decreasing, which they are in every log.
+
+
+class Prefix:
+    """Drops the first `count` samples."""
+
+    def __init__(self, count):
+        self.count = count
+
+    def start(self, trace):
+        return min(self.count, len(trace))
+
+
+class Fraction:
+    """Drops the samples whose `column` is below `fraction` of its last value, e.g. the first half of the
+    epochs."""
+
+    def __init__(self, fraction, column=0):
+        self.fraction = fraction
+        self.column = column
+
+    def start(self, trace):
+        if len(trace) == 0:
+            return 0
+        values = trace[:, self.column]
+        return int(np.searchsorted(values, values[-1] * self.fraction, side="left"))
+
+
+class Offset:
+    """Drops the samples up to `offset` after the first one, in the unit of the timestamp `column`.
+
+    With `mark`, the offset counts from the first sample whose `mark` column is set instead: the e2e runs set
+    their debug counter when the benchmark proper starts.
+    """
+
+    def __init__(self, offset, column=0, mark=None):
+        self.offset = offset
+        self.column = column
+        self.mark = mark
+
+    def start(self, trace):
+        if len(trace) == 0:
+            return 0
+        times = trace[:, self.column]
+        first = 0
+        if self.mark is not None:
+            marked = trace[:, self.mark] >= 1
+            first = int(np.argmax(marked))
+            if not marked[first]:
+                raise ValueError("the warm-up mark is never set")
+        return int(np.searchsorted(times, times[first] + self.offset, side="right"))
+
+
+class ChangePoint:
+    """Splits the run where the throughput shifts, at the single change point of its mean that leaves the
+    least squared error on both sides, and drops the samples before it.
+
+    `column` holds the throughput, or a cumulative counter when `time` names the timestamp column to take its
+    rate against. Each side keeps at least `min_fraction` of the samples.
+    """
+
+    def __init__(self, column, time=None, min_fraction=0.05):
+        self.column = column
+        self.time = time
+        self.min_fraction = min_fraction
+
+    def rates(self, trace):
+        values = trace[:, self.column]
+        if self.time is None:
+            return values.astype(float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.diff(values) / np.diff(trace[:, self.time])
+
+    def start(self, trace):
+        x = self.rates(trace)
+        n = len(x)
+        least = max(int(n * self.min_fraction), 1)
+        if n < 2 * least:
+            return 0
+        finite = np.isfinite(x)
+        x = np.where(finite, x - x[finite].mean(), 0.0)
+
+        # For a split before sample k, the squared error of both sides is sum(x^2) minus
+        # S_k^2 / k + (S_n - S_k)^2 / (n - k), so the best split maximizes the latter.
+        S = np.cumsum(x)
+        k = np.arange(least, n - least + 1)
+        head = S[k - 1]
+        gain = head * head / k + (S[-1] - head) ** 2 / (n - k)
+        return int(k[np.argmax(gain)])
+
+
+def trim(trace, strategy):
+    """The steady-state rows of `trace`, as a view."""
+    return trace[strategy.start(trace):]